@@ -0,0 +1,49 @@
+import asyncio
+import os
+import sys
+
+import httpx
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import toggl_server
+
+
+def reset_state():
+    toggl_server.close_tenants()
+    toggl_server._rate_buckets.clear()
+    toggl_server._inflight_requests.clear()
+    toggl_server.close_entry_store()
+
+
+@pytest.fixture
+def server(monkeypatch):
+    """toggl_server with a test token, an in-memory entry store and no rate limiting or backoff."""
+    monkeypatch.setattr(toggl_server, "API_TOKEN", "test-token")
+    monkeypatch.setattr(toggl_server, "MULTI_TENANT", False)
+    monkeypatch.setattr(toggl_server, "ENTRY_STORE_PATH", ":memory:")
+    monkeypatch.setattr(toggl_server, "RATE_LIMIT_PER_SECOND", 1000.0)
+    monkeypatch.setattr(toggl_server, "RATE_LIMIT_BURST", 1000)
+    monkeypatch.setattr(toggl_server, "WORKSPACE_RATE_LIMIT_PER_SECOND", 1000.0)
+    monkeypatch.setattr(toggl_server, "RETRY_BASE_DELAY", 0.0)
+    monkeypatch.setattr(toggl_server, "circuit_breaker", toggl_server.CircuitBreaker(
+        toggl_server.BREAKER_FAILURE_THRESHOLD, toggl_server.BREAKER_RESET_TIMEOUT
+    ))
+    reset_state()
+    yield toggl_server
+    reset_state()
+
+
+@pytest.fixture
+def run_api(server):
+    """Run coroutine_function() against a mock Toggl API served by handler(request)."""
+    def run(handler, coroutine_function):
+        async def main():
+            server._http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            try:
+                return await coroutine_function()
+            finally:
+                await server.close_http_client()
+        return asyncio.run(main())
+    return run
@@ -0,0 +1,107 @@
+import httpx
+import pytest
+
+
+def failing_handler(calls):
+    def handler(request):
+        calls.append(request.url.path)
+        return httpx.Response(500, json={"error": "down"})
+    return handler
+
+
+def test_breaker_opens_during_retry_loop(server, run_api):
+    calls = []
+    breaker = server.circuit_breaker
+
+    async def main():
+        # The first call exhausts its retries, the second trips the breaker mid-loop
+        with pytest.raises(httpx.HTTPStatusError):
+            await server.send_toggl_request("GET", "/me")
+        assert len(calls) == server.RETRY_MAX_ATTEMPTS
+        with pytest.raises(server.CircuitOpenError):
+            await server.send_toggl_request("GET", "/me")
+        assert breaker.state == "open"
+        sent = len(calls)
+        with pytest.raises(server.CircuitOpenError):
+            await server.send_toggl_request("GET", "/me")
+        return sent
+
+    sent = run_api(failing_handler(calls), main)
+    # Each failed attempt counts, so the circuit opens after exactly
+    # BREAKER_FAILURE_THRESHOLD requests and the next call never reaches Toggl
+    assert sent == breaker.failure_threshold
+    assert len(calls) == sent
+
+
+def test_failed_probe_stops_retries(server, run_api, monkeypatch):
+    calls = []
+    breaker = server.circuit_breaker
+    breaker.record_failure(probe=True)
+    monkeypatch.setattr(breaker, "opened_at", breaker.opened_at - breaker.reset_timeout)
+
+    async def main():
+        with pytest.raises(server.CircuitOpenError):
+            await server.send_toggl_request("GET", "/me")
+
+    run_api(failing_handler(calls), main)
+    assert len(calls) == 1
+    assert breaker.state == "open"
+    assert not breaker.probe_in_flight
+
+
+def test_success_resets_failures(server, run_api):
+    responses = iter([500, 500, 200])
+    breaker = server.circuit_breaker
+
+    def handler(request):
+        return httpx.Response(next(responses), json={"id": 1})
+
+    assert run_api(handler, lambda: server.send_toggl_request("GET", "/me")) == {"id": 1}
+    assert breaker.state == "closed"
+    assert breaker.failures == 0
+
+
+def test_breaker_state_transitions(server, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(server.time, "monotonic", lambda: clock[0])
+    breaker = server.CircuitBreaker(failure_threshold=2, reset_timeout=30)
+
+    assert breaker.before_request() is False
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(server.CircuitOpenError):
+        breaker.before_request()
+
+    # After the reset timeout exactly one probe goes through
+    clock[0] += 30
+    assert breaker.before_request() is True
+    assert breaker.state == "half-open"
+    with pytest.raises(server.CircuitOpenError):
+        breaker.before_request()
+
+    # A failed probe re-opens the circuit for another period
+    breaker.record_failure(probe=True)
+    assert breaker.state == "open"
+    clock[0] += 29
+    with pytest.raises(server.CircuitOpenError):
+        breaker.before_request()
+
+    clock[0] += 1
+    assert breaker.before_request() is True
+    breaker.record_success(probe=True)
+    assert breaker.state == "closed"
+    assert breaker.failures == 0
+    assert breaker.before_request() is False
+
+
+def test_released_probe_lets_the_next_request_probe(server, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(server.time, "monotonic", lambda: clock[0])
+    breaker = server.CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock[0] += 30
+    assert breaker.before_request() is True
+    breaker.release_probe()
+    assert breaker.before_request() is True
@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+
+
+def test_cursor_round_trip(server):
+    payload = {"d": 7, "s": 1767225600, "k": [1767225600, 42], "q": "café ☕"}
+    cursor = server.encode_cursor(payload)
+    assert "=" not in cursor
+    assert server.decode_cursor(cursor) == payload
+    assert server.read_cursor(f"  {cursor}\n", lambda state: state["k"]) == [1767225600, 42]
+
+
+@pytest.mark.parametrize("cursor", ["", "not base64!", "bnVsbA", "WzEsMl0"])
+def test_malformed_cursors_are_rejected(server, cursor):
+    assert server.read_cursor(cursor, lambda state: state["d"]) is None
+
+
+def entries_handler(entries):
+    def handler(request):
+        path = request.url.path
+        if path.endswith("/me/time_entries/current"):
+            return httpx.Response(200, json=None)
+        if path.endswith("/me/time_entries"):
+            return httpx.Response(200, json=entries)
+        return httpx.Response(404)
+    return handler
+
+
+def make_entries(count):
+    now = datetime.now(timezone.utc)
+    return [
+        {
+            "id": index + 1,
+            "workspace_id": 7,
+            "start": (now - timedelta(hours=index + 1)).isoformat(),
+            "duration": 60,
+            "description": f"Entry number {index + 1} with some text"
+        }
+        for index in range(count)
+    ]
+
+
+@pytest.mark.parametrize("store_path", [":memory:", "off"])
+def test_timer_stats_cursor_pages_through_every_entry(server, run_api, monkeypatch, store_path):
+    monkeypatch.setattr(server, "ENTRY_STORE_PATH", store_path)
+    entries = make_entries(12)
+
+    async def main():
+        pages = []
+        cursor = ""
+        while True:
+            result = await server.view_timer_stats(days="7", limit="50", output_format="json", cursor=cursor, max_bytes="1200")
+            assert not result.isError, result.content[0].text
+            pages.append(result.structuredContent)
+            cursor = result.structuredContent.get("next_cursor")
+            if not cursor:
+                return pages
+
+    pages = run_api(entries_handler(entries), main)
+    assert len(pages) > 1
+    ids = [entry["id"] for page in pages for entry in page["recent_entries"]]
+    assert ids == list(range(1, 13))
+    assert all(page["entry_count"] == 12 for page in pages)
+
+
+@pytest.mark.parametrize("store_path", [":memory:", "off"])
+def test_list_time_entries_cursor_pages_are_stable(server, run_api, monkeypatch, store_path):
+    monkeypatch.setattr(server, "ENTRY_STORE_PATH", store_path)
+    monkeypatch.setattr(server, "STORE_SYNC_INTERVAL", 0.0)
+    entries = make_entries(9)
+    # Two entries with the same start are ordered by ID
+    entries[4]["start"] = entries[3]["start"]
+    today = datetime.now(timezone.utc).date()
+
+    async def list_page(cursor=""):
+        result = await server.list_time_entries(
+            start_date=(today - timedelta(days=2)).isoformat(),
+            end_date=today.isoformat(),
+            page_size="4",
+            cursor=cursor,
+            output_format="json"
+        )
+        assert not result.isError, result.content[0].text
+        return result.structuredContent
+
+    async def main():
+        pages = [await list_page()]
+        # An entry started after the first page must not shift later pages
+        entries.insert(0, {**make_entries(1)[0], "id": 100, "start": datetime.now(timezone.utc).isoformat()})
+        while pages[-1]["next_cursor"]:
+            pages.append(await list_page(pages[-1]["next_cursor"]))
+        return pages
+
+    pages = run_api(entries_handler(entries), main)
+    assert [len(page["entries"]) for page in pages] == [4, 4, 1]
+    assert [page["has_more"] for page in pages] == [True, True, False]
+    ids = [entry["id"] for page in pages for entry in page["entries"]]
+    assert ids == [1, 2, 3, 5, 4, 6, 7, 8, 9]
@@ -0,0 +1,14 @@
+def test_socket_override_keeps_tokens_apart(server, monkeypatch):
+    monkeypatch.setattr(server, "DAEMON_SOCKET", "/run/toggl/daemon.sock")
+    paths = {}
+    for token in ("token-a", "token-b"):
+        monkeypatch.setattr(server, "API_TOKEN", token)
+        paths[token] = server.get_daemon_socket_path()
+    assert paths["token-a"] != paths["token-b"]
+    assert paths["token-a"] == f"/run/toggl/daemon-{server.get_store_key('token-a')}.sock"
+
+
+def test_default_socket_includes_the_store_key(server, monkeypatch):
+    monkeypatch.setattr(server, "DAEMON_SOCKET", "")
+    monkeypatch.setenv("XDG_RUNTIME_DIR", "/run/user/1000")
+    assert server.get_daemon_socket_path() == f"/run/user/1000/toggl-mcp-{server.get_store_key('test-token')}.sock"
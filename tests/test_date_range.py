@@ -0,0 +1,51 @@
+from datetime import datetime, timezone
+
+import httpx
+
+
+def counting_handler(requests):
+    def handler(request):
+        requests.append(request)
+        if request.url.path.endswith("/me/time_entries/current"):
+            return httpx.Response(200, json=None)
+        return httpx.Response(200, json=[])
+    return handler
+
+
+def test_view_timer_stats_rejects_days_past_the_limit(server, run_api):
+    requests = []
+    result = run_api(counting_handler(requests), lambda: server.view_timer_stats(days="3650"))
+    assert result.isError
+    assert result.content[0].text == server.RANGE_TOO_LONG_ERROR
+    assert requests == []
+
+
+def test_view_time_breakdown_rejects_days_past_the_limit(server, run_api):
+    requests = []
+    result = run_api(counting_handler(requests), lambda: server.view_time_breakdown(days="3650"))
+    assert result.isError
+    assert requests == []
+
+
+def test_list_time_entries_rejects_ranges_past_the_limit(server, run_api):
+    requests = []
+    result = run_api(counting_handler(requests), lambda: server.list_time_entries(start_date="2000-01-01"))
+    assert result.isError
+    assert result.content[0].text == server.RANGE_TOO_LONG_ERROR
+    assert requests == []
+
+
+def test_longest_allowed_range_stays_within_a_few_windows(server, run_api):
+    requests = []
+    result = run_api(counting_handler(requests), lambda: server.view_timer_stats(days=str(server.MAX_RANGE_DAYS)))
+    assert not result.isError, result.content[0].text
+    windows = [request for request in requests if "start_date" in request.url.params]
+    assert len(windows) == -(-(server.MAX_RANGE_DAYS + 1) // server.FETCH_WINDOW_DAYS)
+
+
+def test_split_date_range_covers_the_range_without_gaps(server):
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    end = datetime(2026, 4, 15, tzinfo=timezone.utc)
+    windows = server.split_date_range(start, end)
+    assert windows[0][0] == start and windows[-1][1] == end
+    assert all(previous[1] == following[0] for previous, following in zip(windows, windows[1:]))
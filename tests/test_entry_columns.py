@@ -0,0 +1,75 @@
+import math
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+zoneinfo = pytest.importorskip("zoneinfo")
+
+
+def make_columns(server, durations, starts=None, tag_ids=None):
+    columns = server.EntryColumns()
+    base = datetime(2026, 3, 1, tzinfo=timezone.utc)
+    for index, duration in enumerate(durations):
+        start = starts[index] if starts else base + timedelta(minutes=index)
+        tags = tag_ids[index] if tag_ids else ()
+        columns.append(server.TimeEntry(index + 1, 7, index % 3 or None, "Entry", start, duration, tags))
+    return columns
+
+
+def nearest_rank(values, percent):
+    ordered = sorted(values)
+    return ordered[max(1, math.ceil(len(ordered) * percent / 100)) - 1]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_percentiles_match_nearest_rank(server, seed):
+    rng = random.Random(seed)
+    durations = [rng.randint(1, 36000) for _ in range(rng.randint(1, 300))]
+    columns = make_columns(server, durations)
+    percents = (1, 25, 50, 90, 99, 100)
+    assert columns.percentiles(*percents) == [nearest_rank(durations, p) for p in percents]
+
+
+def test_percentiles_of_no_entries_are_zero(server):
+    assert server.EntryColumns().percentiles(50, 90, 99) == [0, 0, 0]
+
+
+def test_histogram_buckets_include_their_lower_bound(server):
+    bounds = server.DURATION_HISTOGRAM_BOUNDS
+    durations = [1, bounds[0] - 1, bounds[0], bounds[-1] - 1, bounds[-1], bounds[-1] * 10]
+    columns = make_columns(server, durations)
+    edges = (0,) + bounds + (math.inf,)
+    expected = [sum(low <= d < high for d in durations) for low, high in zip(edges, edges[1:])]
+    assert columns.histogram() == expected
+    assert sum(columns.histogram()) == len(durations)
+
+
+def test_appending_refreshes_the_sorted_cache(server):
+    columns = make_columns(server, [600, 1200])
+    assert columns.percentiles(100) == [1200]
+    columns.append(server.TimeEntry(3, 7, None, "Entry", datetime(2026, 3, 2, tzinfo=timezone.utc), 99999))
+    assert columns.percentiles(100) == [99999]
+    assert columns.histogram()[-1] == 1
+
+
+@pytest.mark.parametrize("tz_name", ["UTC", "America/Los_Angeles", "Asia/Kolkata", "Australia/Adelaide", "Asia/Kathmandu"])
+def test_by_day_matches_local_dates(server, tz_name):
+    tz = zoneinfo.ZoneInfo(tz_name)
+    rng = random.Random(tz_name)
+    base = datetime(2026, 3, 1, tzinfo=timezone.utc)
+    starts = [base + timedelta(seconds=rng.randint(0, 60 * 86400)) for _ in range(500)]
+    durations = [rng.randint(60, 7200) for _ in starts]
+    columns = make_columns(server, durations, starts)
+
+    expected = {}
+    for start, duration in zip(starts, durations):
+        day = start.astimezone(tz).date()
+        seconds, count = expected.get(day, (0, 0))
+        expected[day] = (seconds + duration, count + 1)
+    assert columns.by_day(tz) == expected
+
+
+def test_by_tag_counts_each_tag_and_untagged_entries(server):
+    columns = make_columns(server, [100, 200, 300], tag_ids=[(1, 2), (), (2,)])
+    assert columns.by_tag() == {1: (100, 1), 2: (400, 2), 0: (200, 1)}
@@ -0,0 +1,147 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+
+
+def test_blank_descriptions_read_back_like_from_json(server):
+    store = server.TimeEntryStore(":memory:")
+    entries = [
+        {"id": 1, "workspace_id": 7, "start": "2026-03-01T09:00:00+00:00", "duration": 60, "description": ""},
+        {"id": 2, "workspace_id": 7, "start": "2026-03-01T10:00:00+00:00", "duration": 60, "description": None},
+        {"id": 3, "workspace_id": 7, "start": "2026-03-01T11:00:00+00:00", "duration": 60},
+        {"id": 4, "workspace_id": 7, "start": "2026-03-01T12:00:00+00:00", "duration": 60, "description": "Review"},
+    ]
+    store.apply("key", entries)
+    stored = [entry.description for entry in store.iter_entries_since("key", 0)]
+    assert stored == [server.TimeEntry.from_json(data).description for data in entries]
+    assert stored == ["No description"] * 3 + ["Review"]
+    raw = [row[0] for row in store.db.execute("SELECT description FROM time_entries ORDER BY id")]
+    assert raw == [None, None, None, "Review"]
+
+
+class FakeToggl:
+    """Serves /me/time_entries from a dict of entries, honouring start_date/end_date and since."""
+
+    def __init__(self, entries):
+        self.entries = {entry["id"]: entry for entry in entries}
+        self.requests = []
+
+    def handler(self, request):
+        params = request.url.params
+        self.requests.append(dict(params))
+        if "since" in params:
+            since = int(params["since"])
+            found = [entry for entry in self.entries.values() if entry["at"] >= since]
+        else:
+            start = datetime.fromisoformat(params["start_date"])
+            end = datetime.fromisoformat(params["end_date"])
+            found = [
+                entry for entry in self.entries.values()
+                if not entry.get("server_deleted_at") and start <= datetime.fromisoformat(entry["start"]) < end
+            ]
+        return httpx.Response(200, json=found)
+
+    def window_requests(self):
+        return [params for params in self.requests if "start_date" in params]
+
+
+def make_entry(id, start, at, **fields):
+    return {"id": id, "workspace_id": 7, "start": start.isoformat(), "duration": 60, "at": at, **fields}
+
+
+def stored_ids(server, since_date):
+    store = server.get_entry_store()
+    return [entry.id for entry in store.iter_entries_since(server.get_tenant().store_key, int(since_date.timestamp()))]
+
+
+@pytest.fixture
+def today():
+    return datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def test_first_sync_downloads_the_window(server, run_api, today):
+    now = int(time.time())
+    toggl = FakeToggl([
+        make_entry(1, today - timedelta(days=20), now),
+        make_entry(2, today - timedelta(days=3), now),
+        make_entry(3, today + timedelta(hours=1), now),
+    ])
+    since = today - timedelta(days=7)
+
+    async def main():
+        await server.sync_time_entries(since)
+        return stored_ids(server, datetime.fromtimestamp(0, timezone.utc))
+
+    assert run_api(toggl.handler, main) == [2, 3]
+    assert toggl.window_requests() and all("since" not in params for params in toggl.requests)
+    state = server.get_entry_store().get_sync_state(server.get_tenant().store_key)
+    assert state[1] == int(since.timestamp())
+
+
+def test_older_window_is_backfilled_below_covered_since(server, run_api, monkeypatch, today):
+    monkeypatch.setattr(server, "STORE_SYNC_INTERVAL", 3600.0)
+    now = int(time.time())
+    toggl = FakeToggl([
+        make_entry(1, today - timedelta(days=20), now),
+        make_entry(2, today - timedelta(days=3), now),
+    ])
+
+    async def main():
+        await server.sync_time_entries(today - timedelta(days=7))
+        toggl.requests.clear()
+        await server.sync_time_entries(today - timedelta(days=30))
+        return stored_ids(server, today - timedelta(days=30))
+
+    assert run_api(toggl.handler, main) == [1, 2]
+    # Only the missing range is fetched, and the delta sync waits for the interval
+    windows = toggl.window_requests()
+    assert windows and max(datetime.fromisoformat(params["end_date"]) for params in windows) == today - timedelta(days=7)
+    assert all("since" not in params for params in toggl.requests)
+    state = server.get_entry_store().get_sync_state(server.get_tenant().store_key)
+    assert state[1] == int((today - timedelta(days=30)).timestamp())
+
+
+def test_delta_sync_applies_updates_and_deletions(server, run_api, today):
+    started = int(time.time()) - 600
+    toggl = FakeToggl([
+        make_entry(1, today - timedelta(days=2), started),
+        make_entry(2, today - timedelta(days=1), started),
+    ])
+    since = today - timedelta(days=7)
+
+    async def main():
+        await server.sync_time_entries(since)
+        later = int(time.time()) + 10
+        toggl.entries[1] = make_entry(1, today - timedelta(days=2), later, server_deleted_at=later)
+        toggl.entries[2] = make_entry(2, today - timedelta(days=1), later, description="Edited")
+        toggl.entries[3] = make_entry(3, today - timedelta(hours=1), later)
+        toggl.requests.clear()
+        await server.sync_time_entries(since, force_delta=True)
+        store = server.get_entry_store()
+        return list(store.iter_entries_since(server.get_tenant().store_key, int(since.timestamp())))
+
+    entries = run_api(toggl.handler, main)
+    assert [entry.id for entry in entries] == [2, 3]
+    assert entries[0].description == "Edited"
+    assert [params for params in toggl.requests] == [{"since": toggl.requests[0]["since"]}]
+
+
+def test_stale_store_is_cleared_and_resynced(server, run_api, today):
+    now = int(time.time())
+    toggl = FakeToggl([make_entry(2, today - timedelta(days=1), now)])
+    since = today - timedelta(days=7)
+    store = server.get_entry_store()
+    store_key = server.get_tenant().store_key
+    store.apply(store_key, [make_entry(1, today - timedelta(days=2), now)])
+    store.set_sync_state(store_key, now - int(server.STORE_MAX_DELTA_AGE) - 60, int(since.timestamp()))
+
+    async def main():
+        await server.sync_time_entries(since)
+        return stored_ids(server, since)
+
+    # Entry 1 was deleted upstream long ago; a full resync drops it
+    assert run_api(toggl.handler, main) == [2]
+    assert toggl.window_requests() and all("since" not in params for params in toggl.requests)
+    assert store.get_sync_state(store_key)[0] >= now
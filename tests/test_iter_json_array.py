@@ -0,0 +1,53 @@
+import asyncio
+import json
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import toggl_server
+
+
+async def _chunks(parts):
+    for part in parts:
+        yield part
+
+
+def decode(parts):
+    async def collect():
+        return [item async for item in toggl_server.iter_json_array(_chunks(parts))]
+    return asyncio.run(collect())
+
+
+def split_randomly(text, rng):
+    parts = []
+    position = 0
+    while position < len(text):
+        size = rng.randint(1, 8)
+        parts.append(text[position:position + size])
+        position += size
+    return parts
+
+
+def test_numbers_split_inside_fraction_or_exponent():
+    assert decode(["[1, 2.", "5]"]) == [1, 2.5]
+    assert decode(["[1e", "5]"]) == [1e5]
+    assert decode(["[-", "3, 4", "0]"]) == [-3, 40]
+
+
+def test_null_and_empty_arrays():
+    assert decode(["nu", "ll"]) == []
+    assert decode(["[", " ]"]) == []
+
+
+def test_random_chunk_boundaries_match_json_loads():
+    rng = random.Random(1234)
+    values = [
+        0, -7, 12.5, -0.25, 1e5, 3.14e-2, True, False, None, "", "a,b]c",
+        "quote \" and \u00e9", [], [1, [2.5, "x"]], {}, {"id": 1, "tags": ["a", "b"], "duration": -1.5e3},
+    ]
+    for _ in range(500):
+        document = [rng.choice(values) for _ in range(rng.randint(0, 12))]
+        text = json.dumps(document, separators=rng.choice([(",", ":"), (", ", ": ")]))
+        assert decode(split_randomly(text, rng)) == json.loads(text), text
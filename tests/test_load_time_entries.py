@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+
+
+def entries_handler(entries, window_requests):
+    def handler(request):
+        path = request.url.path
+        if path.endswith("/me/time_entries/current"):
+            return httpx.Response(200, json=None)
+        if path.endswith("/me/time_entries"):
+            window_requests.append(request)
+            # Every window reports every entry, as if they all sat on a boundary
+            return httpx.Response(200, json=entries)
+        return httpx.Response(404)
+    return handler
+
+
+@pytest.mark.parametrize("store_path", [":memory:", "off"])
+def test_timer_stats_count_each_entry_once(server, run_api, monkeypatch, store_path):
+    monkeypatch.setattr(server, "ENTRY_STORE_PATH", store_path)
+    monkeypatch.setattr(server, "FETCH_WINDOW_DAYS", 10)
+    now = datetime.now(timezone.utc)
+    entries = [
+        {
+            "id": index + 1,
+            "workspace_id": 7,
+            "start": (now - timedelta(days=index, hours=1)).isoformat(),
+            "duration": 60 * (index + 1),
+            "description": f"Entry {index}"
+        }
+        for index in range(20)
+    ]
+    window_requests = []
+
+    result = run_api(
+        entries_handler(entries, window_requests),
+        lambda: server.view_timer_stats(days="30", limit="3", output_format="json")
+    )
+    assert not result.isError, result.content[0].text
+    assert len(window_requests) > 1
+    stats = result.structuredContent
+    assert stats["entry_count"] == 20
+    assert stats["total_seconds"] == sum(entry["duration"] for entry in entries)
+    assert [entry["id"] for entry in stats["recent_entries"]] == [1, 2, 3]
+
+
+def test_store_off_streams_batches_into_consume(server, run_api, monkeypatch):
+    monkeypatch.setattr(server, "ENTRY_STORE_PATH", "off")
+    monkeypatch.setattr(server, "STORE_BATCH_SIZE", 4)
+    now = datetime.now(timezone.utc)
+    entries = [
+        {"id": index + 1, "workspace_id": 7, "start": (now - timedelta(hours=index)).isoformat(), "duration": 60}
+        for index in range(10)
+    ]
+    batches = []
+
+    async def main():
+        await server.load_time_entries(now - timedelta(days=1), lambda batch: batches.append(list(batch)))
+
+    run_api(entries_handler(entries, []), main)
+    assert all(len(batch) <= 4 for batch in batches)
+    assert sorted(entry.id for batch in batches for entry in batch) == list(range(1, 11))
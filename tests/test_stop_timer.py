@@ -0,0 +1,56 @@
+from datetime import datetime, timedelta, timezone
+
+import httpx
+
+RUNNING = {"id": 5, "workspace_id": 7, "description": "Writing", "start": "2026-01-01T09:00:00Z", "duration": -1}
+
+
+def lost_stop_handler(stopped_at):
+    """First stop attempt times out after stopping the entry; the retry is rejected."""
+    stops = []
+
+    def handler(request):
+        path = request.url.path
+        if path.endswith("/stop"):
+            stops.append(request)
+            if len(stops) == 1:
+                raise httpx.ReadTimeout("timed out", request=request)
+            return httpx.Response(409, text="Time entry already stopped")
+        if path.endswith("/me/time_entries/current"):
+            return httpx.Response(200, json=RUNNING)
+        if path.endswith("/me/time_entries/5"):
+            return httpx.Response(200, json={**RUNNING, "duration": 600, "stop": stopped_at.isoformat()})
+        return httpx.Response(404)
+
+    return handler, stops
+
+
+def test_fast_path_reports_a_stop_whose_response_was_lost(server, run_api):
+    handler, stops = lost_stop_handler(datetime.now(timezone.utc))
+
+    async def stop():
+        server.get_tenant().running_entry = {"id": 5, "workspace_id": 7, "description": "Writing"}
+        return await server.stop_timer()
+
+    result = run_api(handler, stop)
+    assert not result.isError, result.content[0].text
+    assert result.structuredContent["id"] == 5
+    assert result.structuredContent["duration_seconds"] == 600
+    assert len(stops) == 2
+
+
+def test_discovery_path_reports_a_stop_whose_response_was_lost(server, run_api):
+    handler, stops = lost_stop_handler(datetime.now(timezone.utc))
+
+    result = run_api(handler, server.stop_timer)
+    assert not result.isError, result.content[0].text
+    assert result.structuredContent["description"] == "Writing"
+    assert len(stops) == 2
+
+
+def test_discovery_path_reports_an_entry_stopped_earlier_as_an_error(server, run_api):
+    handler, _ = lost_stop_handler(datetime.now(timezone.utc) - timedelta(hours=1))
+
+    result = run_api(handler, server.stop_timer)
+    assert result.isError
+    assert "409" in result.content[0].text
@@ -0,0 +1,40 @@
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+
+zoneinfo = pytest.importorskip("zoneinfo")
+
+
+@pytest.mark.parametrize("tz_name", ["America/Los_Angeles", "Asia/Tokyo", "UTC"])
+def test_day_breakdown_covers_exactly_the_requested_days(server, run_api, tz_name):
+    tz = zoneinfo.ZoneInfo(tz_name)
+    today = datetime.now(tz).replace(hour=0, minute=0, second=0, microsecond=0)
+    # One entry just after local midnight on each of the last nine days
+    entries = [
+        {
+            "id": offset + 1,
+            "workspace_id": 7,
+            "start": (today - timedelta(days=offset) + timedelta(minutes=5)).isoformat(),
+            "duration": 600,
+            "description": f"Day {offset}"
+        }
+        for offset in range(9)
+    ]
+
+    def handler(request):
+        path = request.url.path
+        if path.endswith("/me/time_entries/current"):
+            return httpx.Response(200, json=None)
+        if path.endswith("/me/time_entries"):
+            return httpx.Response(200, json=entries)
+        if path.endswith("/me"):
+            return httpx.Response(200, json={"id": 1, "timezone": tz_name, "default_workspace_id": 7})
+        return httpx.Response(404)
+
+    result = run_api(handler, lambda: server.view_time_breakdown(days="7", group_by="day", output_format="json"))
+    assert not result.isError, result.content[0].text
+    groups = result.structuredContent["groups"]
+    expected = [(today - timedelta(days=offset)).date().isoformat() for offset in range(7)]
+    assert [group["key"] for group in groups] == expected
+    assert all(group["count"] == 1 for group in groups)
@@ -0,0 +1,8 @@
+def test_bulk_decoding_leaves_the_timestamp_cache_alone(server):
+    server.parse_toggl_timestamp.cache_clear()
+    hot = server.parse_toggl_timestamp("2026-03-01T08:00:00Z")
+    for index in range(server.TIMESTAMP_CACHE_SIZE + 10):
+        entry = server.TimeEntry.from_json({"id": index, "start": f"2026-03-01T09:00:{index % 60:02d}.{index:06d}Z"})
+        assert entry.start is not None
+    assert server.parse_toggl_timestamp.cache_info().currsize == 1
+    assert server.parse_toggl_timestamp("2026-03-01T08:00:00Z") is hot
@@ -0,0 +1,63 @@
+import asyncio
+import time
+
+
+def timed(coroutine_function):
+    async def main():
+        started = time.monotonic()
+        await coroutine_function()
+        return time.monotonic() - started
+    return asyncio.run(main())
+
+
+def test_burst_then_paced_at_the_rate(server):
+    async def main():
+        bucket = server.TokenBucket(50.0, 2)
+        for _ in range(5):
+            await bucket.acquire()
+
+    # Two tokens are available at once; the other three refill at 50/s
+    assert 0.05 <= timed(main) < 0.5
+
+
+def test_pause_blocks_until_it_expires(server):
+    async def main():
+        bucket = server.TokenBucket(1000.0, 10)
+        bucket.pause(0.1)
+        await bucket.acquire()
+
+    assert timed(main) >= 0.09
+
+
+def test_throttled_halves_the_rate_and_success_recovers(server):
+    async def main():
+        bucket = server.TokenBucket(8.0, 4)
+        for expected in (4.0, 2.0, 1.0, 1.0):
+            bucket.throttled(retry_after=0)
+            assert bucket.rate == expected
+        for _ in range(20):
+            bucket.succeeded()
+        return bucket.rate
+
+    # Never slower than an eighth of the base rate, and back to it after enough successes
+    assert asyncio.run(main()) == 8.0
+
+
+def test_background_waits_for_foreground_and_leaves_a_spare_token(server):
+    async def main():
+        bucket = server.TokenBucket(20.0, 2)
+        order = []
+
+        async def take(name, background):
+            await bucket.acquire(background)
+            order.append(name)
+
+        await take("foreground", False)
+        # One token left: background keeps it spare, the next foreground call takes it
+        background = asyncio.ensure_future(take("background", True))
+        await asyncio.sleep(0)
+        await take("foreground", False)
+        await background
+        return order
+
+    assert asyncio.run(main()) == ["foreground", "foreground", "background"]
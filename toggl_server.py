@@ -2,14 +2,65 @@
 """
 Simple Toggl Time Tracking MCP Server - Track your time with Toggl
 """
+from __future__ import annotations
+
 import os
 import sys
 import logging
 import json
 import base64
-from datetime import datetime, timezone
-import httpx
-from mcp.server.fastmcp import FastMCP
+import bisect
+import collections
+import contextvars
+import functools
+import hashlib
+import heapq
+import importlib
+import time
+import random
+import re
+import socket
+import subprocess
+import threading
+from array import array
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Annotated
+
+# pydantic only accepts typing_extensions' TypedDict before Python 3.12
+from typing_extensions import NotRequired, TypedDict
+
+class LazyModule:
+    """Stand-in for a module that is only imported on first attribute access."""
+    
+    __slots__ = ("name", "module")
+    
+    def __init__(self, name):
+        self.name = name
+        self.module = None
+    
+    def load(self):
+        if self.module is None:
+            self.module = importlib.import_module(self.name)
+        return self.module
+    
+    def __getattr__(self, attribute):
+        return getattr(self.load(), attribute)
+
+# Heavy dependencies are imported on first use, so the daemon relay and tool
+# registration never pay for them and a stdio server only does once it serves
+asyncio = LazyModule("asyncio")
+anyio = LazyModule("anyio")
+httpx = LazyModule("httpx")
+sqlite3 = LazyModule("sqlite3")
+zoneinfo = LazyModule("zoneinfo")
+email_utils = LazyModule("email.utils")
+mcp_types = LazyModule("mcp.types")
+mcp_lowlevel = LazyModule("mcp.server.lowlevel.server")
+mcp_message = LazyModule("mcp.shared.message")
+
+# Start of the module body, for --profile-startup
+_MODULE_STARTED = time.perf_counter()
 
 # Configure logging to stderr
 logging.basicConfig(
@@ -19,109 +70,2356 @@ logging.basicConfig(
 )
 logger = logging.getLogger("toggl-server")
 
-# Initialize MCP server - NO PROMPT PARAMETER!
-mcp = FastMCP("toggl")
+def env_int(name, default):
+    """Read an integer setting from the environment, falling back on bad values."""
+    value = os.environ.get(name, "").strip()
+    if not value:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        logger.warning(f"Ignoring invalid {name}={value!r}, using {default}")
+        return default
+
+def env_float(name, default):
+    """Read a float setting from the environment, falling back on bad values."""
+    value = os.environ.get(name, "").strip()
+    if not value:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        logger.warning(f"Ignoring invalid {name}={value!r}, using {default}")
+        return default
+
+def env_bool(name, default=False):
+    """Read a boolean flag from the environment."""
+    value = os.environ.get(name, "").strip().lower()
+    if not value:
+        return default
+    return value in ("1", "true", "yes", "on")
+
+# Configuration
+API_TOKEN = os.environ.get("TOGGL_API_TOKEN", "")
+BASE_URL = "https://api.track.toggl.com/api/v9"
+API_ORIGIN = "https://api.track.toggl.com/"
+
+# HTTP connection pool settings
+HTTP_TIMEOUT = env_float("TOGGL_HTTP_TIMEOUT", 10.0)
+HTTP_MAX_CONNECTIONS = env_int("TOGGL_HTTP_MAX_CONNECTIONS", 20)
+HTTP_MAX_KEEPALIVE = env_int("TOGGL_HTTP_MAX_KEEPALIVE", 10)
+HTTP_KEEPALIVE_EXPIRY = env_float("TOGGL_HTTP_KEEPALIVE_EXPIRY", 60.0)
+HTTP2_ENABLED = env_bool("TOGGL_HTTP2")
+
+# Optional connection warm-up at startup and keepalive pings while idle
+PREWARM_ENABLED = env_bool("TOGGL_PREWARM")
+PREWARM_CONNECTIONS = env_int("TOGGL_PREWARM_CONNECTIONS", 2)
+KEEPALIVE_INTERVAL = env_float("TOGGL_KEEPALIVE_INTERVAL", 0.0)
+
+# Cache settings
+PROFILE_CACHE_TTL = env_float("TOGGL_PROFILE_CACHE_TTL", env_float("TOGGL_WORKSPACE_CACHE_TTL", 3600.0))
+PROFILE_STALE_TTL = env_float("TOGGL_PROFILE_STALE_TTL", 86400.0)
+
+# Client-side rate limiting (Toggl allows roughly 1 request/second per token)
+RATE_LIMIT_PER_SECOND = env_float("TOGGL_RATE_LIMIT_PER_SECOND", 1.0)
+RATE_LIMIT_BURST = env_int("TOGGL_RATE_LIMIT_BURST", 3)
+WORKSPACE_RATE_LIMIT_PER_SECOND = env_float("TOGGL_WORKSPACE_RATE_LIMIT_PER_SECOND", 1.0)
+RATE_LIMIT_MAX_REQUEUES = env_int("TOGGL_RATE_LIMIT_MAX_REQUEUES", 5)
+
+# Retry settings for transient failures
+RETRY_MAX_ATTEMPTS = env_int("TOGGL_RETRY_MAX_ATTEMPTS", 4)
+RETRY_BASE_DELAY = env_float("TOGGL_RETRY_BASE_DELAY", 0.25)
+RETRY_MAX_DELAY = env_float("TOGGL_RETRY_MAX_DELAY", 4.0)
+RETRY_DEADLINE = env_float("TOGGL_RETRY_DEADLINE", 20.0)
+
+# Methods that are safe to repeat; other requests are sent once
+IDEMPOTENT_METHODS = ("GET", "HEAD", "PUT", "DELETE")
+RETRYABLE_STATUSES = (500, 502, 503, 504)
+
+# Timers created with an idempotency key are remembered per token for this long
+IDEMPOTENCY_TTL = env_float("TOGGL_IDEMPOTENCY_TTL", 600.0)
+IDEMPOTENCY_CACHE_SIZE = 100
+
+# Circuit breaker for Toggl API outages
+BREAKER_FAILURE_THRESHOLD = env_int("TOGGL_BREAKER_FAILURE_THRESHOLD", 5)
+BREAKER_RESET_TIMEOUT = env_float("TOGGL_BREAKER_RESET_TIMEOUT", 30.0)
+
+# Local time-entry store (SQLite); set to "off" to always query Toggl directly
+ENTRY_STORE_PATH = os.environ.get(
+    "TOGGL_ENTRY_STORE",
+    os.path.join(os.path.expanduser("~"), ".cache", "toggl-mcp", "entries.sqlite3")
+)
+STORE_SYNC_INTERVAL = env_float("TOGGL_STORE_SYNC_INTERVAL", 30.0)
+STORE_MAX_DELTA_AGE = env_float("TOGGL_STORE_MAX_DELTA_AGE", 30 * 86400.0)
+STORE_SYNC_OVERLAP = 60
+STORE_BATCH_SIZE = 500
+STORE_SCHEMA_VERSION = 3
+
+# Page sizes for list_time_entries
+LIST_DEFAULT_PAGE_SIZE = 50
+LIST_MAX_PAGE_SIZE = 200
+
+# Long date ranges are split into windows fetched in parallel
+FETCH_WINDOW_DAYS = env_int("TOGGL_FETCH_WINDOW_DAYS", 30)
+FETCH_CONCURRENCY = env_int("TOGGL_FETCH_CONCURRENCY", 4)
+# Longest date range a tool call may cover, so one call never fans out into
+# more window requests than the rate limit can serve before clients time out
+MAX_RANGE_DAYS = env_int("TOGGL_MAX_RANGE_DAYS", 366)
+
+# Multi-tenant mode: each HTTP request brings its own Toggl token
+MULTI_TENANT = env_bool("TOGGL_MULTI_TENANT")
+TENANT_CACHE_SIZE = env_int("TOGGL_TENANT_CACHE_SIZE", 1000)
+TENANT_TOKEN_HEADER = "X-Toggl-Api-Token"
+
+# MCP transport: "stdio" (one client per process), "streamable-http" or "sse"
+SERVER_TRANSPORT = os.environ.get("TOGGL_TRANSPORT", "stdio").strip().lower()
+SERVER_HOST = os.environ.get("TOGGL_SERVER_HOST", "127.0.0.1")
+SERVER_PORT = env_int("TOGGL_SERVER_PORT", 8000)
+SERVER_STATELESS = env_bool("TOGGL_SERVER_STATELESS")
+SERVER_TRANSPORTS = ("stdio", "streamable-http", "sse")
+
+# Sidecar daemon: stdio servers relay to one long-lived process over a Unix socket
+DAEMON_ENABLED = env_bool("TOGGL_DAEMON")
+DAEMON_SOCKET = os.environ.get("TOGGL_DAEMON_SOCKET", "")
+DAEMON_IDLE_TIMEOUT = env_float("TOGGL_DAEMON_IDLE_TIMEOUT", 1800.0)
+DAEMON_START_TIMEOUT = env_float("TOGGL_DAEMON_START_TIMEOUT", 10.0)
+DAEMON_LINE_LIMIT = 16 * 1024 * 1024
+
+# Optional background worker that keeps the entry store warm
+BACKGROUND_SYNC_ENABLED = env_bool("TOGGL_BACKGROUND_SYNC")
+BACKGROUND_SYNC_MIN_INTERVAL = env_float("TOGGL_BACKGROUND_SYNC_MIN_INTERVAL", 15.0)
+BACKGROUND_SYNC_MAX_INTERVAL = env_float("TOGGL_BACKGROUND_SYNC_MAX_INTERVAL", 300.0)
+BACKGROUND_SYNC_DAYS = env_int("TOGGL_BACKGROUND_SYNC_DAYS", 7)
+
+# Default response budget for list-style tool output (0 = unlimited)
+RESPONSE_MAX_TOKENS = env_int("TOGGL_RESPONSE_MAX_TOKENS", 0)
+BYTES_PER_TOKEN = 4
+
+# Status codes that mean a cached profile / workspace ID may no longer be valid
+WORKSPACE_INVALIDATING_STATUSES = (401, 403, 404)
+
+# Shared HTTP client, owned by the server lifespan
+_http_client = None
+
+# Per-token state (TenantContext) in least-recently-used order
+_tenants = collections.OrderedDict()
+
+# Workspace token buckets keyed by ("workspace", workspace_id), least recently used first
+_rate_buckets = collections.OrderedDict()
+
+# Server metrics reported by the view_server_metrics tool
+_metrics = {
+    "requests": 0,
+    "retries": 0,
+    "retry_wait_seconds": 0.0,
+    "retries_exhausted": 0,
+    "breaker_trips": 0,
+    "breaker_fast_fails": 0,
+    "coalesced_requests": 0,
+    "sessions_active": 0,
+    "sessions_total": 0,
+    "tenant_evictions": 0,
+    "connections_opened": 0,
+    "connect_seconds": 0.0,
+    "tls_seconds": 0.0,
+    "first_request_seconds": None,
+    "prewarm_connections": 0,
+    "prewarm_seconds": None,
+    "keepalive_pings": 0,
+    "keepalive_failures": 0
+}
+
+# Last time a request or ping used the HTTP pool (monotonic clock)
+_last_upstream_activity = 0.0
+
+# In-flight GET requests keyed by (token, path, params) for request coalescing
+_inflight_requests = {}
+
+# True while running in the low-priority background lane
+_background_lane = contextvars.ContextVar("background_lane", default=False)
+
+# Local entry store, opened on first use
+_entry_store = None
+# Holders of the shared HTTP pool, entry store and sync worker
+_shared_holders = 0
+_shared_tasks = []
+
+# Open daemon connections and when the last one closed
+_daemon_connections = 0
+_daemon_idle_since = 0.0
+
+
+# === UTILITY FUNCTIONS ===
+
+def get_auth_header():
+    """Create basic auth header for Toggl API."""
+    if not current_token():
+        return {}
+    return get_tenant().auth_header
+
+def create_http_client():
+    """Create the pooled HTTP client used for all Toggl API calls."""
+    http2 = HTTP2_ENABLED
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            logger.warning("TOGGL_HTTP2 is set but the 'h2' package is not installed - using HTTP/1.1")
+            http2 = False
+    
+    limits = httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+    )
+    logger.info(f"HTTP pool ready (max_connections={HTTP_MAX_CONNECTIONS}, max_keepalive={HTTP_MAX_KEEPALIVE}, http2={http2})")
+    return httpx.AsyncClient(limits=limits, http2=http2, timeout=HTTP_TIMEOUT)
+
+def get_http_client():
+    """Return the shared HTTP client, creating it if the lifespan has not run yet."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = create_http_client()
+    return _http_client
+
+async def close_http_client():
+    """Close the shared HTTP client and release pooled connections."""
+    global _http_client
+    client, _http_client = _http_client, None
+    if client is not None and not client.is_closed:
+        await client.aclose()
+
+async def gather_or_cancel(*coros):
+    """Run coroutines concurrently and return their results in order.
+    
+    If any of them fails, the others are cancelled and the first error is raised.
+    """
+    tasks = [asyncio.ensure_future(coro) for coro in coros]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        for task in tasks:
+            if task.done() and not task.cancelled() and task.exception() is not None:
+                raise task.exception()
+        return [task.result() for task in tasks]
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+async def iter_json_array(chunks):
+    """Decode a JSON array from an async stream of text chunks, one element at a time.
+    
+    Only the element currently being decoded is buffered, so memory stays flat
+    regardless of the array length. A JSON null is treated as an empty array.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    position = 0
+    started = False
+    exhausted = False
+    chunk_iter = chunks.__aiter__()
+    
+    while True:
+        # Skip whitespace and separators
+        while position < len(buffer) and buffer[position] in " \t\r\n,":
+            position += 1
+        
+        if position < len(buffer):
+            if not started:
+                if buffer[position] == "[":
+                    started = True
+                    position += 1
+                    continue
+                if buffer.startswith("null", position):
+                    return
+                if exhausted or not "null".startswith(buffer[position:]):
+                    raise ValueError("Expected a JSON array")
+            elif buffer[position] == "]":
+                return
+            else:
+                try:
+                    item, end = decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    if exhausted:
+                        raise
+                else:
+                    # A number cut by the chunk boundary ("2." or "1e") decodes short,
+                    # so only trust an element that is followed by a delimiter
+                    if exhausted or (end < len(buffer) and buffer[end] in " \t\r\n,]"):
+                        yield item
+                        position = end
+                        continue
+        elif exhausted:
+            if started or buffer[position:].strip():
+                raise ValueError("Unexpected end of JSON array")
+            return
+        
+        # Need more data: drop what has been consumed and read the next chunk
+        buffer = buffer[position:]
+        position = 0
+        try:
+            buffer += await chunk_iter.__anext__()
+        except StopAsyncIteration:
+            exhausted = True
+
+def parse_days(days, default=7):
+    """Parse a day-count tool argument, falling back to the default on bad input."""
+    try:
+        days_int = int(days) if days.strip() else default
+    except ValueError:
+        return default
+    return days_int if days_int > 0 else default
+
+def parse_date(value):
+    """Parse a YYYY-MM-DD tool argument as UTC midnight (ValueError if malformed)."""
+    return datetime.strptime(value.strip(), "%Y-%m-%d").replace(tzinfo=timezone.utc)
+
+def window_start(days_int, tz=timezone.utc):
+    """Midnight in tz at the start of a window covering the last days_int days, as a UTC datetime."""
+    today = datetime.now(tz).replace(hour=0, minute=0, second=0, microsecond=0)
+    return (today - timedelta(days=days_int - 1)).astimezone(timezone.utc)
+
+def format_duration(seconds):
+    """Format duration in seconds to human readable format."""
+    if seconds < 0:
+        return "Running..."
+    
+    hours = seconds // 3600
+    minutes = (seconds % 3600) // 60
+    secs = seconds % 60
+    
+    if hours > 0:
+        return f"{hours}h {minutes}m {secs}s"
+    elif minutes > 0:
+        return f"{minutes}m {secs}s"
+    else:
+        return f"{secs}s"
+
+def format_time_entry(entry):
+    """Format a time entry for display."""
+    start_time = entry.start.strftime('%Y-%m-%d %H:%M') if entry.start else ""
+    return f"• {entry.description} - {format_duration(entry.duration)} (started: {start_time})"
+
+OUTPUT_FORMATS = ("text", "compact", "json")
+INVALID_CURSOR_ERROR = "❌ Error: Invalid cursor"
+RANGE_TOO_LONG_ERROR = f"❌ Error: Date ranges are limited to {MAX_RANGE_DAYS} days"
+OUTPUT_FORMAT_ERROR = f"❌ Error: output_format must be one of: {', '.join(OUTPUT_FORMATS)}"
+TOKEN_MISSING_ERROR = (
+    f"❌ Error: No Toggl API token - send it in the {TENANT_TOKEN_HEADER} header"
+    if MULTI_TENANT else "❌ Error: TOGGL_API_TOKEN not configured"
+)
+
+def parse_output_format(output_format):
+    """Normalise an output_format tool argument (None if it is not supported)."""
+    output_format = output_format.strip().lower() or "text"
+    return output_format if output_format in OUTPUT_FORMATS else None
+
+def render_output(data, output_format, render_full, render_compact=None):
+    """Render the text content of a tool result in the requested format.
+    
+    The renderers are only called for the format that was asked for, so
+    structured-only callers skip text formatting entirely.
+    """
+    if output_format == "json":
+        return json.dumps(data, separators=(",", ":"), default=str)
+    if output_format == "compact":
+        return (render_compact or render_full)()
+    return render_full()
+
+def tool_result(data, output_format, render_full, render_compact=None):
+    """Build a tool result carrying structured content alongside text."""
+    text = render_output(data, output_format, render_full, render_compact)
+    return mcp_types.CallToolResult(content=[mcp_types.TextContent(type="text", text=text)], structuredContent=data)
+
+def tool_error(message):
+    """Build an error tool result."""
+    return mcp_types.CallToolResult(
+        content=[mcp_types.TextContent(type="text", text=message)],
+        structuredContent={"error": message},
+        isError=True
+    )
+
+def parse_budget(max_tokens, max_bytes):
+    """Resolve token/byte budget tool arguments to a byte budget (0 = unlimited)."""
+    budgets = []
+    try:
+        tokens = int(max_tokens) if max_tokens.strip() else RESPONSE_MAX_TOKENS
+    except ValueError:
+        tokens = RESPONSE_MAX_TOKENS
+    if tokens > 0:
+        budgets.append(tokens * BYTES_PER_TOKEN)
+    try:
+        if max_bytes.strip() and int(max_bytes) > 0:
+            budgets.append(int(max_bytes))
+    except ValueError:
+        pass
+    return min(budgets) if budgets else 0
+
+def fit_to_budget(render, count, budget):
+    """Largest number of items, up to count, whose rendering fits in budget bytes.
+    
+    render(n) returns the response text with the first n items. Summary lines
+    are always kept, so the result can be 0 even when that does not fit.
+    """
+    if not budget or len(render(count).encode()) <= budget:
+        return count
+    low, high = 0, count - 1
+    while low < high:
+        middle = (low + high + 1) // 2
+        if len(render(middle).encode()) <= budget:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+def more_marker(more, next_cursor, budget_cut):
+    """The line ending a shortened list (more is None when the count is unknown)."""
+    text = f"… {more} more entries" if more is not None else "… more entries"
+    if next_cursor:
+        return f"{text} (cursor: {next_cursor})"
+    if budget_cut:
+        return f"{text} (raise max_tokens or max_bytes to list them)"
+    return text
+
+def paged_tool_result(build_result, count, budget, output_format, render_full, render_compact):
+    """Fit a paged result to the response budget and return it as a tool result.
+    
+    build_result(shown) returns the structured result listing the first shown
+    of count items; render_full(result) and render_compact(result) render it.
+    """
+    def render(shown):
+        result = build_result(shown)
+        return render_output(result, output_format, lambda: render_full(result), lambda: render_compact(result))
+    
+    result = build_result(fit_to_budget(render, count, budget))
+    return tool_result(result, output_format, lambda: render_full(result), lambda: render_compact(result))
+
+def encode_cursor(payload):
+    """Encode pagination state as an opaque URL-safe cursor."""
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by encode_cursor (ValueError if it is malformed)."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(payload, dict):
+        raise ValueError("Invalid cursor")
+    return payload
+
+def read_cursor(cursor, parse):
+    """Decode a cursor tool argument and return parse(payload), or None if it is invalid."""
+    try:
+        return parse(decode_cursor(cursor.strip()))
+    except (ValueError, KeyError, TypeError):
+        return None
+
+# === TENANTS ===
+
+class TenantContext:
+    """Everything cached for one Toggl token.
+    
+    In single-user mode there is one context for TOGGL_API_TOKEN; in
+    multi-tenant mode each token seen gets its own, up to TENANT_CACHE_SIZE.
+    """
+    
+    __slots__ = (
+        "token", "store_key", "auth_header", "profile", "profile_refresh",
+        "running_entry", "created_entries", "rate_bucket", "sync_lock", "entry_index"
+    )
+    
+    def __init__(self, token):
+        self.token = token
+        self.store_key = get_store_key(token)
+        # Toggl uses API token as username with 'api_token' as password
+        credentials = f"{token}:api_token"
+        self.auth_header = {"Authorization": f"Basic {base64.b64encode(credentials.encode()).decode()}"}
+        # Profile snapshot: {"data", "fetched_at", "related"}
+        self.profile = None
+        # Background stale-while-revalidate refresh task
+        self.profile_refresh = None
+        # Running time entry last started or observed
+        self.running_entry = None
+        # Idempotency key -> (expires_at, create future), oldest first
+        self.created_entries = collections.OrderedDict()
+        self.rate_bucket = TokenBucket(RATE_LIMIT_PER_SECOND, RATE_LIMIT_BURST)
+        # Delta sync lock for the entry store
+        self.sync_lock = asyncio.Lock()
+        # Last listed range when the entry store is disabled
+        self.entry_index = None
+    
+    def close(self):
+        if self.profile_refresh is not None:
+            self.profile_refresh.cancel()
+
+def current_token():
+    """Return the Toggl token for the current call.
+    
+    In multi-tenant mode a tool call uses the token sent with its HTTP request
+    (X-Toggl-Api-Token, or an Authorization bearer token) and never falls back
+    to TOGGL_API_TOKEN; work outside a request, such as background sync, uses
+    TOGGL_API_TOKEN.
+    """
+    if not MULTI_TENANT:
+        return API_TOKEN
+    try:
+        request = mcp_lowlevel.request_ctx.get().request
+    except LookupError:
+        return API_TOKEN
+    headers = getattr(request, "headers", None)
+    if headers is None:
+        return ""
+    token = headers.get(TENANT_TOKEN_HEADER)
+    if not token:
+        scheme, _, credentials = headers.get("Authorization", "").partition(" ")
+        token = credentials if scheme.lower() == "bearer" else ""
+    return token.strip()
+
+def get_tenant(token=None):
+    """Return the context for a token (default: the current one), evicting the least recently used."""
+    token = current_token() if token is None else token
+    tenant = _tenants.get(token)
+    if tenant is not None:
+        _tenants.move_to_end(token)
+        return tenant
+    
+    tenant = _tenants[token] = TenantContext(token)
+    while len(_tenants) > max(1, TENANT_CACHE_SIZE):
+        _, evicted = _tenants.popitem(last=False)
+        evicted.close()
+        _metrics["tenant_evictions"] += 1
+    return tenant
+
+def close_tenants():
+    """Drop every tenant context and cancel their background work."""
+    for tenant in _tenants.values():
+        tenant.close()
+    _tenants.clear()
+
+# === TIME ENTRY MODEL ===
+
+TIMESTAMP_CACHE_SIZE = 1024
+
+def _parse_timestamp(value):
+    """Parse a Toggl ISO-8601 timestamp into an aware datetime (None if missing or invalid).
+    
+    Handles 'Z' and numeric offsets with or without fractional seconds;
+    timestamps without an offset are taken as UTC.
+    """
+    if not value:
+        return None
+    try:
+        # Python 3.11+ parses every Toggl format natively
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        try:
+            parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+# Memoized for values seen repeatedly, such as the running timer's start time
+parse_toggl_timestamp = functools.lru_cache(maxsize=TIMESTAMP_CACHE_SIZE)(_parse_timestamp)
+
+def timestamps_to_epochs(values):
+    """Convert a column of timestamps to UNIX epoch integers in one pass (0 when missing or invalid).
+    
+    Bypasses the memo cache so bulk conversions do not evict frequently used values.
+    """
+    parse = _parse_timestamp
+    return array('q', [int(parsed.timestamp()) if (parsed := parse(value)) else 0 for value in values])
+
+class TimeEntry:
+    """Compact time entry holding only the fields this server reads.
+    
+    The start time is parsed once on decode and shared by every consumer as
+    both an aware datetime and a UNIX epoch.
+    """
+    
+    __slots__ = (
+        "id", "workspace_id", "project_id", "description",
+        "start", "start_epoch", "duration", "tag_ids", "tags"
+    )
+    
+    def __init__(self, id, workspace_id, project_id, description, start, duration, tag_ids=(), tags=()):
+        self.id = id
+        self.workspace_id = workspace_id
+        self.project_id = project_id
+        self.description = description
+        self.start = start
+        self.start_epoch = int(start.timestamp()) if start else 0
+        self.duration = duration
+        self.tag_ids = tag_ids
+        self.tags = tags
+    
+    def to_json(self):
+        """Structured representation used in tool results."""
+        return {
+            "id": self.id,
+            "description": self.description,
+            "start": self.start.isoformat() if self.start else None,
+            "duration_seconds": self.duration,
+            "project_id": self.project_id,
+            "workspace_id": self.workspace_id,
+            "tag_ids": list(self.tag_ids)
+        }
+    
+    @classmethod
+    def from_json(cls, data):
+        """Project a Toggl time entry dict onto a TimeEntry.
+        
+        Entries are decoded in bulk and their start times are rarely seen
+        twice, so this bypasses the memo cache, like timestamps_to_epochs.
+        """
+        get = data.get
+        return cls(
+            get('id'),
+            get('workspace_id') or get('wid'),
+            get('project_id'),
+            get('description') or 'No description',
+            _parse_timestamp(get('start')),
+            get('duration') or 0,
+            tuple(get('tag_ids') or ()),
+            tuple(get('tags') or ())
+        )
+
+# === AGGREGATION ===
+
+# Upper bounds (seconds) of the duration histogram buckets; the last bucket is open-ended
+DURATION_HISTOGRAM_BOUNDS = (900, 1800, 3600, 7200, 14400)
+GROUP_BY_OPTIONS = ("day", "project", "tag", "client")
+
+class EntryColumns:
+    """Column-oriented store of completed entries for statistics.
+    
+    Durations, start epochs and project IDs live in parallel typed arrays and
+    tag IDs in a flattened array with per-entry offsets, so every statistic is
+    a single pass over one or two columns.
+    """
+    
+    __slots__ = ("durations", "start_epochs", "project_ids", "tag_offsets", "tag_ids", "_sorted")
+    
+    def __init__(self):
+        self.durations = array('q')
+        self.start_epochs = array('q')
+        self.project_ids = array('q')  # 0 when the entry has no project
+        self.tag_offsets = array('q', [0])
+        self.tag_ids = array('q')
+        self._sorted = None
+    
+    def __len__(self):
+        return len(self.durations)
+    
+    def append(self, entry):
+        self.durations.append(entry.duration)
+        self.start_epochs.append(entry.start_epoch)
+        self.project_ids.append(entry.project_id or 0)
+        self.tag_ids.extend(entry.tag_ids)
+        self.tag_offsets.append(len(self.tag_ids))
+        self._sorted = None
+    
+    def total(self):
+        return sum(self.durations)
+    
+    def _sorted_durations(self):
+        if self._sorted is None:
+            self._sorted = sorted(self.durations)
+        return self._sorted
+    
+    def percentiles(self, *percents):
+        """Nearest-rank percentiles of the entry durations."""
+        ordered = self._sorted_durations()
+        if not ordered:
+            return [0 for _ in percents]
+        return [ordered[min(len(ordered) - 1, max(0, -(-len(ordered) * p // 100) - 1))] for p in percents]
+    
+    def histogram(self, bounds=DURATION_HISTOGRAM_BOUNDS):
+        """Count entries per duration bucket, one count per bound plus an overflow bucket."""
+        ordered = self._sorted_durations()
+        positions = [bisect.bisect_left(ordered, bound) for bound in bounds] + [len(ordered)]
+        return [high - low for low, high in zip([0] + positions[:-1], positions)]
+    
+    def _group(self, keys, durations=None):
+        groups = {}
+        for key, duration in zip(keys, self.durations if durations is None else durations):
+            seconds, count = groups.get(key, (0, 0))
+            groups[key] = (seconds + duration, count + 1)
+        return groups
+    
+    def by_day(self, tz=timezone.utc):
+        """Group by calendar day in the given time zone; keys are date objects."""
+        # UTC offsets are whole quarter hours, so a quarter hour never spans two local days
+        days = {}
+        for quarter, (seconds, count) in self._group(epoch // 900 for epoch in self.start_epochs).items():
+            day = datetime.fromtimestamp(quarter * 900, tz).date()
+            day_seconds, day_count = days.get(day, (0, 0))
+            days[day] = (day_seconds + seconds, day_count + count)
+        return days
+    
+    def by_project(self):
+        return self._group(self.project_ids)
+    
+    def by_client(self, project_clients):
+        """Group by client using a project ID -> client ID mapping (0 when unknown)."""
+        return self._group(project_clients.get(project_id, 0) for project_id in self.project_ids)
+    
+    def by_tag(self):
+        """Group by tag ID; an entry counts towards each of its tags, untagged entries under 0."""
+        offsets = self.tag_offsets
+        keys = []
+        durations = []
+        for index, duration in enumerate(self.durations):
+            tags = self.tag_ids[offsets[index]:offsets[index + 1]] or (0,)
+            keys.extend(tags)
+            durations.extend([duration] * len(tags))
+        return self._group(keys, durations)
+
+class TopK:
+    """Streaming selector that keeps the k largest items by key in O(n log k).
+    
+    Ties are broken by arrival order, later items ranking higher, so items
+    themselves are never compared.
+    """
+    
+    __slots__ = ("k", "key", "heap", "counter")
+    
+    def __init__(self, k, key):
+        self.k = k
+        self.key = key
+        self.heap = []
+        self.counter = 0
+    
+    def push(self, item):
+        if self.k <= 0:
+            return
+        self.counter += 1
+        candidate = (self.key(item), self.counter, item)
+        if len(self.heap) < self.k:
+            heapq.heappush(self.heap, candidate)
+        elif candidate > self.heap[0]:
+            heapq.heapreplace(self.heap, candidate)
+    
+    def result(self):
+        """Return the selected items, largest first."""
+        return [item for _, _, item in sorted(self.heap, reverse=True)]
+
+def start_epoch_key(entry):
+    return (entry.start_epoch, entry.id)
+
+# === RATE LIMITING ===
+
+class TokenBucket:
+    """Async token bucket that queues callers until a request slot is free.
+    
+    The refill rate adapts to upstream feedback: it is halved on 429 responses
+    and recovers gradually towards the configured rate on success.
+    """
+    
+    def __init__(self, rate, capacity):
+        self.base_rate = rate
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = asyncio.Lock()
+        self.waiting = 0
+    
+    def _refill(self, now):
+        if now > self.updated_at:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+    
+    async def acquire(self, background=False):
+        """Wait until a token is available and consume it.
+        
+        Background callers only take a token when no foreground request is
+        queued, and leave one token spare for the next foreground request.
+        """
+        if background:
+            reserve = 1 if self.capacity > 1 else 0
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if not self.waiting and now >= self.blocked_until and self.tokens >= 1 + reserve:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep(max(self.blocked_until - now, 1 / self.rate))
+        
+        self.waiting += 1
+        try:
+            async with self.lock:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    wait = self.blocked_until - now
+                    if wait <= 0 and self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    if wait <= 0:
+                        wait = (1 - self.tokens) / self.rate
+                    await asyncio.sleep(wait)
+        finally:
+            self.waiting -= 1
+    
+    def pause(self, seconds):
+        """Block the bucket for the given number of seconds, then allow one request."""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        self.updated_at = self.blocked_until
+        self.tokens = 1.0
+    
+    def throttled(self, retry_after=None):
+        """Slow down after a 429 response."""
+        self.rate = max(self.base_rate / 8, self.rate / 2)
+        self.pause(retry_after if retry_after is not None else 1 / self.rate)
+        logger.warning(f"Rate limited by Toggl, slowing to {self.rate:.2f} req/s")
+    
+    def succeeded(self):
+        """Recover towards the configured rate after a successful request."""
+        if self.rate < self.base_rate:
+            self.rate = min(self.base_rate, self.rate + self.base_rate * 0.1)
+
+def get_rate_bucket(kind, key):
+    """Return the token bucket for a token or workspace, creating it on first use.
+    
+    Workspace buckets are kept for at most TENANT_CACHE_SIZE workspaces, like
+    tenant contexts; an evicted workspace starts with a full bucket.
+    """
+    if kind == "token":
+        return get_tenant(key).rate_bucket
+    bucket = _rate_buckets.get((kind, key))
+    if bucket is not None:
+        _rate_buckets.move_to_end((kind, key))
+        return bucket
+    
+    bucket = _rate_buckets[(kind, key)] = TokenBucket(WORKSPACE_RATE_LIMIT_PER_SECOND, RATE_LIMIT_BURST)
+    while len(_rate_buckets) > max(1, TENANT_CACHE_SIZE):
+        _rate_buckets.popitem(last=False)
+    return bucket
+
+def parse_retry_after(response):
+    """Return the Retry-After delay of a response in seconds, if present."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email_utils.parsedate_to_datetime(value)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+def apply_quota_headers(bucket, response):
+    """Pause a bucket when Toggl reports that the hourly quota is used up."""
+    remaining = response.headers.get("X-Toggl-Quota-Remaining")
+    resets_in = response.headers.get("X-Toggl-Quota-Resets-In")
+    if remaining is None or resets_in is None:
+        return
+    try:
+        if int(remaining) <= 0:
+            bucket.pause(float(resets_in))
+            logger.warning(f"Toggl quota exhausted, pausing requests for {resets_in}s")
+    except ValueError:
+        pass
+
+# === CIRCUIT BREAKER ===
+
+class CircuitOpenError(Exception):
+    """Raised when the circuit breaker rejects a request without calling Toggl."""
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker around the Toggl API.
+    
+    After failure_threshold consecutive upstream failures the circuit opens
+    and requests fail fast. Once reset_timeout has passed a single probe
+    request is let through; its outcome closes or re-opens the circuit.
+    """
+    
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+    
+    def before_request(self):
+        """Return True if this request is the half-open probe; raise if the circuit is open."""
+        if self.state == "closed":
+            return False
+        
+        remaining = self.opened_at + self.reset_timeout - time.monotonic()
+        if self.state == "open" and remaining <= 0:
+            self.state = "half-open"
+        if self.state == "half-open" and not self.probe_in_flight:
+            self.probe_in_flight = True
+            logger.info("Circuit half-open, sending probe request to Toggl")
+            return True
+        
+        _metrics["breaker_fast_fails"] += 1
+        raise CircuitOpenError(
+            f"Toggl API is unavailable - failing fast for the next {max(0, int(remaining)) or 1}s"
+        )
+    
+    def record_success(self, probe=False):
+        if probe:
+            self.probe_in_flight = False
+        if self.state != "closed":
+            logger.info("Circuit closed, Toggl API recovered")
+        self.state = "closed"
+        self.failures = 0
+    
+    def record_failure(self, probe=False):
+        if probe:
+            self.probe_in_flight = False
+        self.failures += 1
+        if probe or (self.state == "closed" and self.failures >= self.failure_threshold):
+            if self.state == "closed":
+                _metrics["breaker_trips"] += 1
+            self.state = "open"
+            self.opened_at = time.monotonic()
+            logger.warning(f"Circuit open after {self.failures} failures, failing fast for {self.reset_timeout}s")
+    
+    def release_probe(self):
+        """Give up the probe slot without recording an outcome (e.g. on cancellation)."""
+        self.probe_in_flight = False
+
+circuit_breaker = CircuitBreaker(BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_TIMEOUT)
+
+# === TOGGL API ===
+
+_WORKSPACE_PATH = re.compile(r"^/workspaces/(\d+)")
+
+def connection_tracer():
+    """Return an httpx trace hook that records new connections and their setup time."""
+    started = {}
+    
+    async def trace(event_name, info):
+        step, _, phase = event_name.rpartition(".")
+        if phase == "started":
+            started[step] = time.perf_counter()
+        elif phase == "complete" and step in started:
+            elapsed = time.perf_counter() - started.pop(step)
+            if step == "connection.connect_tcp":
+                _metrics["connections_opened"] += 1
+                _metrics["connect_seconds"] += elapsed
+            elif step == "connection.start_tls":
+                _metrics["tls_seconds"] += elapsed
+    
+    return trace
+
+async def send_rate_limited(method, path, params=None, json_body=None, headers=None, stream=False):
+    """Send one request through the token and workspace buckets.
+    
+    429 responses are re-queued after the Retry-After delay, so the caller only
+    sees a 429 once RATE_LIMIT_MAX_REQUEUES is used up. With stream=True the
+    response body is left unread and the caller must close the response.
+    """
+    global _last_upstream_activity
+    client = get_http_client()
+    buckets = [get_rate_bucket("token", current_token())]
+    match = _WORKSPACE_PATH.match(path)
+    workspace_id = match.group(1) if match else (json_body or {}).get("wid")
+    if workspace_id:
+        buckets.append(get_rate_bucket("workspace", str(workspace_id)))
+    
+    background = _background_lane.get()
+    for attempt in range(RATE_LIMIT_MAX_REQUEUES + 1):
+        for bucket in buckets:
+            await bucket.acquire(background)
+        _metrics["requests"] += 1
+        request = client.build_request(
+            method, f"{BASE_URL}{path}",
+            headers=headers, params=params, json=json_body,
+            extensions={"trace": connection_tracer()}
+        )
+        sent_at = time.perf_counter()
+        response = await client.send(request, stream=stream)
+        _last_upstream_activity = time.monotonic()
+        if _metrics["first_request_seconds"] is None:
+            _metrics["first_request_seconds"] = time.perf_counter() - sent_at
+        
+        for bucket in buckets:
+            apply_quota_headers(bucket, response)
+        if response.status_code != 429:
+            for bucket in buckets:
+                bucket.succeeded()
+            break
+        
+        retry_after = parse_retry_after(response)
+        for bucket in buckets:
+            bucket.throttled(retry_after)
+        if attempt < RATE_LIMIT_MAX_REQUEUES:
+            await response.aclose()
+    
+    return response
+
+def retry_delay(attempt):
+    """Full-jitter exponential backoff for the given retry attempt."""
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * (2 ** attempt)))
+
+async def send_with_retries(method, path, params=None, json_body=None, idempotent=None, stream=False):
+    """Send a request, retrying transient failures, and return the last response.
+    
+    Idempotent requests (GET/PUT/DELETE, or anything marked idempotent) are
+    retried on connection errors and 5xx responses with jittered backoff
+    until RETRY_MAX_ATTEMPTS or RETRY_DEADLINE is reached. Other requests
+    are sent once; see create_time_entry for how creates are retried.
+    
+    Every attempt goes through the circuit breaker, so each failure counts
+    towards opening it, and CircuitOpenError is raised as soon as it opens
+    instead of waiting out the remaining retries.
+    """
+    headers = {"Content-Type": "application/json", **get_auth_header()}
+    if idempotent is None:
+        idempotent = method in IDEMPOTENT_METHODS
+    retryable = idempotent
+    
+    deadline = time.monotonic() + RETRY_DEADLINE
+    attempt = 0
+    while True:
+        probe = circuit_breaker.before_request()
+        error = None
+        response = None
+        try:
+            response = await send_rate_limited(method, path, params=params, json_body=json_body, headers=headers, stream=stream)
+        except httpx.TransportError as e:
+            error = e
+        except BaseException:
+            if probe:
+                circuit_breaker.release_probe()
+            raise
+        
+        if error is None and response.status_code < 500:
+            circuit_breaker.record_success(probe)
+        else:
+            circuit_breaker.record_failure(probe)
+            if circuit_breaker.state == "open":
+                reason = error or f"HTTP {response.status_code}"
+                if response is not None:
+                    await response.aclose()
+                raise CircuitOpenError(
+                    f"Toggl API is unavailable ({reason}) - failing fast for the next {int(circuit_breaker.reset_timeout) or 1}s"
+                ) from error
+        
+        transient = error is not None or response.status_code in RETRYABLE_STATUSES
+        if not transient:
+            break
+        delay = retry_delay(attempt)
+        if not retryable or attempt + 1 >= RETRY_MAX_ATTEMPTS or time.monotonic() + delay > deadline:
+            if attempt > 0:
+                _metrics["retries_exhausted"] += 1
+            break
+        
+        reason = error or f"HTTP {response.status_code}"
+        if response is not None:
+            await response.aclose()
+        logger.warning(f"{method} {path} failed ({reason}), retrying in {delay:.2f}s")
+        _metrics["retries"] += 1
+        _metrics["retry_wait_seconds"] += delay
+        await asyncio.sleep(delay)
+        attempt += 1
+    
+    if error is not None:
+        raise error
+    return response
+
+async def toggl_request(method, path, params=None, json_body=None, idempotent=None):
+    """Send a request to the Toggl API and return the decoded JSON body.
+    
+    Concurrent identical GETs share one upstream request and its parsed
+    result, so callers must treat the returned data as read-only.
+    Everything else, including background-lane requests, goes straight to
+    send_toggl_request.
+    """
+    if method != "GET" or _background_lane.get():
+        return await send_toggl_request(method, path, params, json_body, idempotent)
+    
+    key = (current_token(), path, tuple(sorted((params or {}).items())))
+    future = _inflight_requests.get(key)
+    if future is not None:
+        _metrics["coalesced_requests"] += 1
+        # Shield so one caller being cancelled does not cancel the shared request
+        return await asyncio.shield(future)
+    
+    future = asyncio.ensure_future(send_toggl_request(method, path, params, json_body, idempotent))
+    _inflight_requests[key] = future
+    
+    def _done(finished):
+        _inflight_requests.pop(key, None)
+        # Mark the error as retrieved in case every caller was cancelled
+        if not finished.cancelled():
+            finished.exception()
+    
+    future.add_done_callback(_done)
+    return await asyncio.shield(future)
+
+async def send_toggl_request(method, path, params=None, json_body=None, idempotent=None, stream=False):
+    """Send one request through the retry layer, circuit breaker and rate limiter.
+    
+    Returns the decoded JSON body, or with stream=True the open response for a
+    successful request (the caller must close it). Raises CircuitOpenError
+    while the Toggl API is considered down.
+    """
+    response = await send_with_retries(
+        method, path,
+        params=params,
+        json_body=json_body,
+        idempotent=idempotent,
+        stream=stream
+    )
+    
+    if stream:
+        if response.is_success:
+            return response
+        # Read the error body so raise_for_status callers can report it
+        await response.aread()
+        await response.aclose()
+    
+    response.raise_for_status()
+    if not response.content:
+        return None
+    return response.json()
+
+# === PROFILE AND TIME ENTRY HELPERS ===
+
+def invalidate_user_profile(token=None):
+    """Drop the cached user profile for a token (default: the current token)."""
+    tenant = get_tenant(token)
+    if tenant.profile is not None:
+        tenant.profile = None
+        logger.info("User profile cache invalidated")
+
+async def fetch_user_profile(with_related_data=False):
+    """Fetch /me from Toggl and store it in the profile cache."""
+    tenant = get_tenant()
+    params = {"with_related_data": "true"} if with_related_data else None
+    user_data = await toggl_request("GET", "/me", params=params)
+    
+    logger.info(f"User profile fetched (user: {user_data.get('id')}, default workspace: {user_data.get('default_workspace_id')})")
+    tenant.profile = {
+        "data": user_data,
+        "fetched_at": time.monotonic(),
+        "related": with_related_data
+    }
+    return user_data
+
+async def _revalidate_user_profile(tenant, with_related_data):
+    """Refresh a stale profile in the background."""
+    try:
+        await fetch_user_profile(with_related_data=with_related_data)
+    except Exception as e:
+        logger.warning(f"Background profile refresh failed: {e}")
+    finally:
+        tenant.profile_refresh = None
+
+async def get_user_profile(force_refresh=False, with_related_data=False):
+    """Return the cached /me profile, refreshing it when missing or expired.
+    
+    Within PROFILE_STALE_TTL after expiry the stale snapshot is returned
+    immediately while a refresh runs in the background.
+    """
+    tenant = get_tenant()
+    cached = tenant.profile
+    if cached and not force_refresh and (cached["related"] or not with_related_data):
+        age = time.monotonic() - cached["fetched_at"]
+        if age < PROFILE_CACHE_TTL:
+            return cached["data"]
+        if age < PROFILE_CACHE_TTL + PROFILE_STALE_TTL:
+            if tenant.profile_refresh is None:
+                tenant.profile_refresh = asyncio.create_task(
+                    _revalidate_user_profile(tenant, cached["related"])
+                )
+            return cached["data"]
+    
+    try:
+        return await fetch_user_profile(with_related_data=with_related_data)
+    except CircuitOpenError:
+        # Toggl is down - any snapshot is better than failing outright
+        if cached and not force_refresh:
+            logger.warning("Circuit open, serving cached user profile")
+            return cached["data"]
+        raise
+
+async def get_user_timezone():
+    """Return the time zone from the cached profile, falling back to UTC when it is unknown."""
+    try:
+        name = (await get_user_profile()).get('timezone')
+        return zoneinfo.ZoneInfo(name) if name else timezone.utc
+    except Exception as e:
+        logger.warning(f"Could not resolve the user's time zone, using UTC: {e}")
+        return timezone.utc
+
+def remember_running_entry(entry):
+    """Record the running entry for the current token, or forget it when None."""
+    if entry and entry.get('id') and entry.get('workspace_id'):
+        get_tenant().running_entry = {
+            "id": entry['id'],
+            "workspace_id": entry['workspace_id'],
+            "description": entry.get('description') or 'No description'
+        }
+    else:
+        get_tenant().running_entry = None
+
+async def fetch_current_entry():
+    """Fetch the currently running time entry (None when no timer is running)."""
+    current_entry = await toggl_request("GET", "/me/time_entries/current")
+    remember_running_entry(current_entry)
+    return current_entry
+
+async def stop_time_entry(workspace_id, entry_id):
+    """Stop a running entry with the dedicated stop endpoint."""
+    data = await toggl_request(
+        "PATCH",
+        f"/workspaces/{workspace_id}/time_entries/{entry_id}/stop",
+        idempotent=True
+    )
+    get_tenant().running_entry = None
+    await store_entries([data])
+    return data
+
+async def send_time_entry_create(entry_data):
+    """POST a new time entry, retrying only when it is known not to exist.
+    
+    Toggl has no idempotency support for creates, and a request that timed out
+    or failed with a 5xx may still have been committed. Before each retry the
+    running entry is checked: if it has the description and start that were
+    sent, that entry is returned instead of creating a second one.
+    """
+    deadline = time.monotonic() + RETRY_DEADLINE
+    attempt = 0
+    while True:
+        try:
+            return await toggl_request("POST", "/time_entries", json_body=entry_data)
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code not in RETRYABLE_STATUSES:
+                raise
+            error, reason = e, f"HTTP {e.response.status_code}"
+        except httpx.TransportError as e:
+            error, reason = e, e
+        
+        delay = retry_delay(attempt)
+        if attempt + 1 >= RETRY_MAX_ATTEMPTS or time.monotonic() + delay > deadline:
+            if attempt > 0:
+                _metrics["retries_exhausted"] += 1
+            raise error
+        
+        logger.warning(f"POST /time_entries failed ({reason}), checking for the entry before retrying in {delay:.2f}s")
+        _metrics["retries"] += 1
+        _metrics["retry_wait_seconds"] += delay
+        await asyncio.sleep(delay)
+        attempt += 1
+        
+        current = await fetch_current_entry()
+        if current and current.get('description') == entry_data['description']:
+            started = parse_toggl_timestamp(current.get('start'))
+            sent = parse_toggl_timestamp(entry_data['start'])
+            # Toggl stores start times to the second
+            if started is not None and abs(started.timestamp() - sent.timestamp()) < 1:
+                logger.info(f"Time entry {current.get('id')} was created by the failed attempt")
+                return current
+
+async def create_time_entry(entry_data, idempotency_key=None):
+    """Create a time entry, at most once per idempotency key.
+    
+    Without a key the create is sent once and never retried. With a key,
+    failed attempts are retried by send_time_entry_create, and repeating the
+    key within IDEMPOTENCY_TTL returns the entry created the first time
+    (waiting for it if that create is still in flight).
+    """
+    if not idempotency_key:
+        return await toggl_request("POST", "/time_entries", json_body=entry_data)
+    
+    created = get_tenant().created_entries
+    now = time.monotonic()
+    while created and next(iter(created.values()))[0] <= now:
+        created.popitem(last=False)
+    
+    cached = created.get(idempotency_key)
+    if cached is not None:
+        logger.info("Idempotency key seen before, returning the entry it created")
+        return await asyncio.shield(cached[1])
+    
+    future = asyncio.ensure_future(send_time_entry_create(entry_data))
+    created[idempotency_key] = (now + IDEMPOTENCY_TTL, future)
+    while len(created) > IDEMPOTENCY_CACHE_SIZE:
+        created.popitem(last=False)
+    
+    def _done(finished):
+        # Forget failed creates so the key can be used again
+        if finished.cancelled() or finished.exception() is not None:
+            if created.get(idempotency_key, (None, None))[1] is finished:
+                del created[idempotency_key]
+    
+    future.add_done_callback(_done)
+    return await asyncio.shield(future)
+
+async def fetch_stopped_entry(entry_id, since):
+    """Return an entry if it was stopped at or after `since` (UNIX seconds), else None.
+    
+    Used when a retried stop is rejected: if the lost first attempt already
+    stopped the entry, Toggl answers the retry with a 4xx even though the
+    stop succeeded. A few seconds of clock skew are allowed for.
+    """
+    try:
+        data = await toggl_request("GET", f"/me/time_entries/{entry_id}")
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code >= 500:
+            raise
+        return None
+    
+    stopped_at = parse_toggl_timestamp(data.get('stop')) if data else None
+    if stopped_at is None or stopped_at.timestamp() < since - 5:
+        return None
+    get_tenant().running_entry = None
+    await store_entries([data])
+    return data
+
+async def stop_time_entry_confirmed(workspace_id, entry_id):
+    """Stop a running entry, confirming a rejected retry against the entry itself.
+    
+    The stop is retried after a lost response, and the retry is rejected with a
+    4xx once the first attempt has stopped the entry. In that case the entry is
+    fetched and returned if it was stopped by this request; otherwise the
+    original error is raised.
+    """
+    requested_at = time.time()
+    try:
+        return await stop_time_entry(workspace_id, entry_id)
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code >= 500:
+            raise
+        data = await fetch_stopped_entry(entry_id, requested_at)
+        if data is None:
+            raise
+        return data
+
+async def fetch_time_entries(params):
+    """Fetch the user's time entries matching the given query parameters."""
+    return await toggl_request("GET", "/me/time_entries", params=params)
+
+async def stream_time_entries(params):
+    """Yield the user's time entries one at a time as the response is decoded.
+    
+    Streaming requests are not coalesced, since each caller consumes the body.
+    """
+    response = await send_toggl_request("GET", "/me/time_entries", params=params, stream=True)
+    try:
+        async for entry in iter_json_array(response.aiter_text()):
+            yield entry
+    finally:
+        await response.aclose()
+
+def split_date_range(start_date, end_date):
+    """Split a date range into consecutive windows of at most FETCH_WINDOW_DAYS."""
+    window = timedelta(days=max(1, FETCH_WINDOW_DAYS))
+    windows = []
+    window_start = start_date
+    while window_start < end_date:
+        window_end = min(window_start + window, end_date)
+        windows.append((window_start, window_end))
+        window_start = window_end
+    return windows
+
+async def fetch_time_entries_range(start_date, end_date):
+    """Fetch entries starting between start_date and end_date as TimeEntry objects, oldest first.
+    
+    The range is split into FETCH_WINDOW_DAYS windows that are fetched
+    concurrently, at most FETCH_CONCURRENCY at a time, and merged in start order.
+    """
+    semaphore = asyncio.Semaphore(max(1, FETCH_CONCURRENCY))
+    
+    async def fetch_window(window_start, window_end):
+        async with semaphore:
+            entries = await fetch_time_entries({
+                "start_date": window_start.isoformat(),
+                "end_date": window_end.isoformat()
+            })
+        return sorted((TimeEntry.from_json(entry) for entry in entries or ()), key=lambda entry: entry.start_epoch)
+    
+    results = await gather_or_cancel(*(fetch_window(*bounds) for bounds in split_date_range(start_date, end_date)))
+    
+    # Windows are disjoint and ordered, so concatenating keeps start order;
+    # skip duplicates in case an entry is reported on both sides of a boundary
+    merged = []
+    seen = set()
+    for entries in results:
+        for entry in entries:
+            if entry.id not in seen:
+                seen.add(entry.id)
+                merged.append(entry)
+    return merged
+
+async def consume_time_entries_range(start_date, end_date, consume):
+    """Stream every window of a date range into consume in batches, windows in parallel.
+    
+    Unlike fetch_time_entries_range nothing is sorted or held beyond one
+    batch, so batches arrive in no particular order.
+    """
+    semaphore = asyncio.Semaphore(max(1, FETCH_CONCURRENCY))
+    seen = set()
+    
+    async def consume_window(window_start, window_end):
+        async with semaphore:
+            batch = []
+            async for data in stream_time_entries({
+                "start_date": window_start.isoformat(),
+                "end_date": window_end.isoformat()
+            }):
+                # Skip entries reported on both sides of a window boundary
+                if data.get('id') in seen:
+                    continue
+                seen.add(data.get('id'))
+                batch.append(TimeEntry.from_json(data))
+                if len(batch) >= STORE_BATCH_SIZE:
+                    consume(batch)
+                    batch = []
+            consume(batch)
+    
+    await gather_or_cancel(*(consume_window(*bounds) for bounds in split_date_range(start_date, end_date)))
+
+async def get_workspace_id(force_refresh=False):
+    """Get the default workspace ID for the user from the cached profile."""
+    try:
+        user_data = await get_user_profile(force_refresh=force_refresh)
+        
+        workspace_id = user_data.get('default_workspace_id')
+        if not workspace_id:
+            logger.warning(f"No default_workspace_id found in response. Available keys: {list(user_data.keys())}")
+            # Try to get the first workspace if no default is set
+            workspaces = user_data.get('workspaces')
+            if workspaces is None:
+                user_data = await get_user_profile(with_related_data=True)
+                workspaces = user_data.get('workspaces', [])
+            if workspaces:
+                workspace_id = workspaces[0].get('id')
+                logger.info(f"Using first available workspace: {workspace_id}")
+        
+        return workspace_id
+    except Exception as e:
+        logger.error(f"Failed to get workspace ID: {e}")
+        return None
+
+# === LOCAL ENTRY STORE ===
+
+class TimeEntryStore:
+    """SQLite mirror of the user's time entries, kept current by delta syncs.
+    
+    Rows are keyed by a hash of the API token so several tokens can share one
+    database without the token itself being written to disk. The methods
+    block, so async code calls them through run(), which uses a worker thread.
+    """
+    
+    def __init__(self, path):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        # One connection shared by worker threads, serialised by the lock
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+        self.lock = threading.Lock()
+        
+        # The store is only a cache, so an outdated schema is simply rebuilt
+        if self.db.execute("PRAGMA user_version").fetchone()[0] != STORE_SCHEMA_VERSION:
+            self.db.executescript("""
+                DROP TABLE IF EXISTS time_entries;
+                DROP TABLE IF EXISTS sync_state;
+            """)
+            self.db.execute(f"PRAGMA user_version = {STORE_SCHEMA_VERSION}")
+        
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS time_entries (
+                store_key TEXT NOT NULL,
+                id INTEGER NOT NULL,
+                workspace_id INTEGER,
+                project_id INTEGER,
+                description TEXT,
+                start_epoch INTEGER,
+                duration INTEGER,
+                tag_ids TEXT,
+                tags TEXT,
+                PRIMARY KEY (store_key, id)
+            );
+            CREATE INDEX IF NOT EXISTS time_entries_start
+                ON time_entries (store_key, start_epoch, id);
+            CREATE TABLE IF NOT EXISTS sync_state (
+                store_key TEXT PRIMARY KEY,
+                last_sync INTEGER NOT NULL,
+                covered_since INTEGER NOT NULL
+            );
+        """)
+        self.db.commit()
+    
+    async def run(self, function, *args):
+        """Call function(*args) in a worker thread while holding the store lock.
+        
+        Batch writes and full scans can take a while, and running them on the
+        event loop would stall every other session of a shared server. Scans
+        must be consumed inside function, because the cursor is only safe to
+        use while the lock is held.
+        """
+        def locked():
+            with self.lock:
+                return function(*args)
+        return await asyncio.to_thread(locked)
+    
+    def close(self):
+        with self.lock:
+            self.db.close()
+    
+    def get_sync_state(self, store_key):
+        """Return (last_sync, covered_since) as UNIX timestamps, or None before the first sync."""
+        row = self.db.execute(
+            "SELECT last_sync, covered_since FROM sync_state WHERE store_key = ?", (store_key,)
+        ).fetchone()
+        return (row["last_sync"], row["covered_since"]) if row else None
+    
+    def set_sync_state(self, store_key, last_sync, covered_since):
+        self.db.execute(
+            "INSERT OR REPLACE INTO sync_state (store_key, last_sync, covered_since) VALUES (?, ?, ?)",
+            (store_key, last_sync, covered_since)
+        )
+        self.db.commit()
+    
+    def apply(self, store_key, entries):
+        """Upsert Toggl entry dicts and drop the ones Toggl reports as deleted."""
+        live = []
+        deleted = []
+        for data in entries:
+            if data.get('server_deleted_at'):
+                deleted.append((store_key, data['id']))
+            else:
+                live.append(data)
+        
+        start_epochs = timestamps_to_epochs([data.get('start') for data in live])
+        rows = [
+            (
+                store_key,
+                data['id'],
+                data.get('workspace_id') or data.get('wid'),
+                data.get('project_id'),
+                data.get('description') or None,
+                start_epoch,
+                data.get('duration') or 0,
+                json.dumps(data.get('tag_ids') or []),
+                json.dumps(data.get('tags') or [])
+            )
+            for data, start_epoch in zip(live, start_epochs)
+        ]
+        with self.db:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO time_entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            self.db.executemany("DELETE FROM time_entries WHERE store_key = ? AND id = ?", deleted)
+    
+    def iter_entries_since(self, store_key, since_epoch):
+        """Yield stored entries starting at or after since_epoch as TimeEntry objects."""
+        rows = self.db.execute(
+            "SELECT id, workspace_id, project_id, description, start_epoch, duration, tag_ids, tags "
+            "FROM time_entries WHERE store_key = ? AND start_epoch >= ? ORDER BY start_epoch",
+            (store_key, since_epoch)
+        )
+        return map(self._entry_from_row, rows)
+    
+    def iter_entries_before(self, store_key, since_epoch, until_epoch, before=None):
+        """Yield entries starting in [since_epoch, until_epoch) below the (start_epoch, id) key before, newest first.
+        
+        The start index turns the cursor into a seek, so deep pages cost the same as the first.
+        """
+        before = tuple(before) if before is not None else (until_epoch, 0)
+        rows = self.db.execute(
+            "SELECT id, workspace_id, project_id, description, start_epoch, duration, tag_ids, tags "
+            "FROM time_entries WHERE store_key = ? AND start_epoch >= ? AND start_epoch < ? "
+            "AND (start_epoch, id) < (?, ?) ORDER BY start_epoch DESC, id DESC",
+            (store_key, since_epoch, until_epoch, *before)
+        )
+        return map(self._entry_from_row, rows)
+    
+    @staticmethod
+    def _entry_from_row(row):
+        id, workspace_id, project_id, description, start_epoch, duration, tag_ids, tags = row
+        return TimeEntry(
+            id,
+            workspace_id,
+            project_id,
+            description or 'No description',
+            datetime.fromtimestamp(start_epoch, timezone.utc) if start_epoch else None,
+            duration,
+            tuple(json.loads(tag_ids)),
+            tuple(json.loads(tags))
+        )
+    
+    def clear(self, store_key):
+        with self.db:
+            self.db.execute("DELETE FROM time_entries WHERE store_key = ?", (store_key,))
+            self.db.execute("DELETE FROM sync_state WHERE store_key = ?", (store_key,))
+
+def get_store_key(token):
+    """Stable, non-reversible key for a token's rows in the entry store."""
+    return hashlib.sha256(token.encode()).hexdigest()[:16]
+
+def get_entry_store():
+    """Return the local entry store, or None when it is disabled or unavailable."""
+    global _entry_store
+    if _entry_store is None and ENTRY_STORE_PATH.lower() not in ("", "off", "none", "false", "0"):
+        try:
+            _entry_store = TimeEntryStore(ENTRY_STORE_PATH)
+            logger.info(f"Entry store opened at {ENTRY_STORE_PATH}")
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"Entry store unavailable ({e}), querying Toggl directly")
+            return None
+    return _entry_store
+
+def close_entry_store():
+    """Close the local entry store if it was opened."""
+    global _entry_store
+    if _entry_store is not None:
+        _entry_store.close()
+    _entry_store = None
+
+async def store_entries(entries):
+    """Write entries returned by Toggl through to the local store."""
+    store = get_entry_store()
+    if store is not None and entries:
+        try:
+            await store.run(store.apply, get_tenant().store_key, entries)
+        except sqlite3.Error as e:
+            logger.warning(f"Could not write entries to the local store: {e}")
+
+async def store_entry_stream(store, store_key, entries):
+    """Write an async stream of entries to the store in batches and return the count."""
+    batch = []
+    count = 0
+    async for entry in entries:
+        batch.append(entry)
+        count += 1
+        if len(batch) >= STORE_BATCH_SIZE:
+            await store.run(store.apply, store_key, batch)
+            batch = []
+    await store.run(store.apply, store_key, batch)
+    return count
+
+async def store_time_entries_range(store, store_key, start_date, end_date):
+    """Stream every window of a date range into the store, windows in parallel."""
+    semaphore = asyncio.Semaphore(max(1, FETCH_CONCURRENCY))
+    
+    async def store_window(window_start, window_end):
+        async with semaphore:
+            return await store_entry_stream(store, store_key, stream_time_entries({
+                "start_date": window_start.isoformat(),
+                "end_date": window_end.isoformat()
+            }))
+    
+    counts = await gather_or_cancel(*(store_window(*bounds) for bounds in split_date_range(start_date, end_date)))
+    return sum(counts)
+
+async def sync_time_entries(since_date, force_delta=False):
+    """Bring the local store up to date for entries starting at or after since_date.
+    
+    The first call downloads the window; later calls only ask Toggl for entries
+    modified since the previous sync (including deletions) and backfill any
+    older range that was not covered yet. Delta syncs are skipped within
+    STORE_SYNC_INTERVAL of the last one unless force_delta is set. Returns the
+    number of entries received.
+    """
+    store = get_entry_store()
+    tenant = get_tenant()
+    store_key = tenant.store_key
+    lock = tenant.sync_lock
+    since_epoch = int(since_date.timestamp())
+    
+    async with lock:
+        state = await store.run(store.get_sync_state, store_key)
+        now = int(time.time())
+        
+        if state and now - state[0] > STORE_MAX_DELTA_AGE:
+            logger.info("Entry store too far behind for a delta sync, resyncing")
+            await store.run(store.clear, store_key)
+            state = None
+        
+        if state is None:
+            changed = await store_time_entries_range(
+                store, store_key,
+                since_date,
+                datetime.now(timezone.utc) + timedelta(days=1)
+            )
+            await store.run(store.set_sync_state, store_key, now, since_epoch)
+            return changed
+        
+        last_sync, covered_since = state
+        changed = 0
+        if since_epoch < covered_since:
+            changed += await store_time_entries_range(
+                store, store_key,
+                since_date,
+                datetime.fromtimestamp(covered_since, timezone.utc)
+            )
+            covered_since = since_epoch
+        
+        if force_delta or now - last_sync >= STORE_SYNC_INTERVAL:
+            # Overlap a little to cover clock skew between us and Toggl
+            changed += await store_entry_stream(
+                store, store_key,
+                stream_time_entries({"since": last_sync - STORE_SYNC_OVERLAP})
+            )
+            last_sync = now
+        
+        await store.run(store.set_sync_state, store_key, last_sync, covered_since)
+        return changed
+
+async def load_time_entries(since_date, consume):
+    """Pass the entries starting at or after since_date to consume.
+    
+    consume may be called several times, with batches in no particular order,
+    and must accumulate its own result. With the local store enabled, entries
+    are streamed from SQLite one row at a time and consume runs once in the
+    store's worker thread; otherwise each fetch window is streamed from Toggl
+    straight into consume.
+    """
+    store = get_entry_store()
+    if store is None:
+        await consume_time_entries_range(
+            since_date,
+            datetime.now(timezone.utc) + timedelta(days=1),
+            consume
+        )
+        return
+    
+    await sync_time_entries(since_date)
+    store_key = get_tenant().store_key
+    since_epoch = int(since_date.timestamp())
+    await store.run(lambda: consume(store.iter_entries_since(store_key, since_epoch)))
+
+# === ENTRY LISTING ===
+
+class EntryFilter:
+    """Optional project, tag and description filters for listing entries."""
+    
+    __slots__ = ("project_id", "tag", "search")
+    
+    def __init__(self, project_id=None, tag=None, search=None):
+        self.project_id = project_id
+        self.tag = tag
+        self.search = search
+    
+    @classmethod
+    def from_cursor(cls, state):
+        return cls(state.get("p"), state.get("t"), state.get("q"))
+    
+    def to_cursor(self):
+        state = {"p": self.project_id, "t": self.tag, "q": self.search}
+        return {key: value for key, value in state.items() if value is not None}
+    
+    def to_json(self):
+        return {"project_id": self.project_id, "tag": self.tag, "search": self.search}
+    
+    def matches(self, entry):
+        if self.project_id is not None and entry.project_id != self.project_id:
+            return False
+        if self.tag is not None:
+            tag = self.tag.lower()
+            if not any(name.lower() == tag for name in entry.tags) and not any(str(tag_id) == tag for tag_id in entry.tag_ids):
+                return False
+        if self.search is not None and self.search.lower() not in (entry.description or "").lower():
+            return False
+        return True
+
+class EntryIndex:
+    """In-memory entries sorted by (start, id), paged by binary search."""
+    
+    __slots__ = ("keys", "entries")
+    
+    def __init__(self, entries):
+        self.entries = sorted(entries, key=start_epoch_key)
+        self.keys = [start_epoch_key(entry) for entry in self.entries]
+    
+    def iter_entries_before(self, since_epoch, until_epoch, before=None):
+        """Yield entries starting in [since_epoch, until_epoch) below the key before, newest first."""
+        low = bisect.bisect_left(self.keys, (since_epoch,))
+        high = bisect.bisect_left(self.keys, (until_epoch,))
+        if before is not None:
+            high = min(high, bisect.bisect_left(self.keys, before))
+        for position in range(high - 1, low - 1, -1):
+            yield self.entries[position]
+
+async def load_time_entries_page(since_date, until_date, before, consume):
+    """Pass entries starting in [since_date, until_date) below the cursor key, newest first, to consume.
+    
+    The position is found by an index seek (local store, with consume running
+    in the store's worker thread) or a binary search (in-memory index), so
+    later pages cost the same as the first. Returns the result of consume.
+    """
+    since_epoch = int(since_date.timestamp())
+    until_epoch = int(until_date.timestamp())
+    store = get_entry_store()
+    if store is not None:
+        await sync_time_entries(since_date)
+        store_key = get_tenant().store_key
+        return await store.run(lambda: consume(store.iter_entries_before(store_key, since_epoch, until_epoch, before)))
+    
+    # Without the store, keep the last downloaded range so following pages reuse it
+    tenant = get_tenant()
+    cached = tenant.entry_index
+    if cached and cached[:2] == (since_epoch, until_epoch) and time.monotonic() - cached[2] < STORE_SYNC_INTERVAL:
+        index = cached[3]
+    else:
+        index = EntryIndex(await fetch_time_entries_range(since_date, until_date))
+        tenant.entry_index = (since_epoch, until_epoch, time.monotonic(), index)
+    return consume(index.iter_entries_before(since_epoch, until_epoch, before))
 
-# Configuration
-API_TOKEN = os.environ.get("TOGGL_API_TOKEN", "")
-BASE_URL = "https://api.track.toggl.com/api/v9"
+# === BACKGROUND SYNC ===
 
-# Debug: Log token status at startup
-logger.info(f"API Token configured: {'Yes' if API_TOKEN else 'No'}")
-if API_TOKEN:
-    logger.info(f"API Token length: {len(API_TOKEN)}")
-    logger.info(f"API Token starts with: {API_TOKEN[:8]}...")
-else:
-    logger.warning("TOGGL_API_TOKEN environment variable not found")
+async def background_sync_worker():
+    """Keep the entry store and running-entry state warm between tool calls.
+    
+    Runs in the low-priority rate-limit lane. The poll interval drops to the
+    minimum after changes are seen and doubles while nothing changes.
+    """
+    _background_lane.set(True)
+    interval = BACKGROUND_SYNC_MIN_INTERVAL
+    logger.info("Background sync worker started")
+    
+    while True:
+        try:
+            since_date = window_start(max(1, BACKGROUND_SYNC_DAYS))
+            
+            store = get_entry_store()
+            state = await store.run(store.get_sync_state, get_tenant().store_key)
+            if state:
+                # Keep whatever range is already mirrored, without backfilling
+                since_date = max(since_date, datetime.fromtimestamp(state[1], timezone.utc))
+            
+            changed, _ = await gather_or_cancel(
+                sync_time_entries(since_date, force_delta=True),
+                fetch_current_entry()
+            )
+            if changed:
+                interval = BACKGROUND_SYNC_MIN_INTERVAL
+            else:
+                interval = min(BACKGROUND_SYNC_MAX_INTERVAL, interval * 2)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Background sync failed: {e}")
+            interval = min(BACKGROUND_SYNC_MAX_INTERVAL, interval * 2)
+        
+        await asyncio.sleep(interval)
 
-# === UTILITY FUNCTIONS ===
+def start_background_sync():
+    """Start the background sync worker if it is enabled and can run."""
+    if not BACKGROUND_SYNC_ENABLED:
+        return None
+    if not API_TOKEN or get_entry_store() is None:
+        logger.warning("Background sync needs TOGGL_API_TOKEN and the entry store - not started")
+        return None
+    return asyncio.create_task(background_sync_worker())
 
-def get_auth_header():
-    """Create basic auth header for Toggl API."""
-    if not API_TOKEN:
-        return {}
+# === CONNECTION WARMING ===
+
+async def ping_upstream():
+    """Send an unauthenticated HEAD to the Toggl API host over the shared pool.
     
-    # Toggl uses API token as username with 'api_token' as password
-    credentials = f"{API_TOKEN}:api_token"
-    encoded = base64.b64encode(credentials.encode()).decode()
-    return {"Authorization": f"Basic {encoded}"}
+    This opens (or keeps open) a pooled connection without using the token's
+    request quota or rate-limit slots; the response status is ignored.
+    """
+    global _last_upstream_activity
+    _last_upstream_activity = time.monotonic()
+    client = get_http_client()
+    response = await client.head(API_ORIGIN, extensions={"trace": connection_tracer()})
+    await response.aclose()
 
-def format_duration(seconds):
-    """Format duration in seconds to human readable format."""
-    if seconds < 0:
-        return "Running..."
+async def prewarm_connections():
+    """Open PREWARM_CONNECTIONS pooled connections (DNS, TCP and TLS) ahead of the first tool call."""
+    started = time.perf_counter()
+    results = await asyncio.gather(
+        *(ping_upstream() for _ in range(max(1, PREWARM_CONNECTIONS))),
+        return_exceptions=True
+    )
+    failures = [result for result in results if isinstance(result, Exception)]
+    _metrics["prewarm_seconds"] = time.perf_counter() - started
+    _metrics["prewarm_connections"] = len(results) - len(failures)
+    if failures:
+        logger.warning(f"Connection pre-warm: {len(failures)} of {len(results)} failed ({failures[0]})")
+    logger.info(f"Connection pre-warm: {_metrics['prewarm_connections']} connections in {_metrics['prewarm_seconds'] * 1000:.0f} ms")
+
+async def keepalive_worker():
+    """Ping the API host whenever the pool has been idle for KEEPALIVE_INTERVAL.
     
-    hours = seconds // 3600
-    minutes = (seconds % 3600) // 60
-    secs = seconds % 60
+    Keeps at least one pooled connection from reaching TOGGL_HTTP_KEEPALIVE_EXPIRY
+    so the next tool call does not pay for a new handshake.
+    """
+    started = time.monotonic()
+    while True:
+        idle = time.monotonic() - max(_last_upstream_activity, started)
+        if idle < KEEPALIVE_INTERVAL:
+            await asyncio.sleep(KEEPALIVE_INTERVAL - idle)
+            continue
+        try:
+            await ping_upstream()
+            _metrics["keepalive_pings"] += 1
+        except httpx.HTTPError as e:
+            _metrics["keepalive_failures"] += 1
+            logger.warning(f"Keepalive ping failed: {e}")
+            await asyncio.sleep(KEEPALIVE_INTERVAL)
+
+def start_connection_warming():
+    """Start the optional pre-warm and keepalive tasks."""
+    tasks = []
+    if PREWARM_ENABLED:
+        tasks.append(asyncio.create_task(prewarm_connections()))
+    if KEEPALIVE_INTERVAL > 0:
+        if KEEPALIVE_INTERVAL >= HTTP_KEEPALIVE_EXPIRY:
+            logger.warning("TOGGL_KEEPALIVE_INTERVAL is not below TOGGL_HTTP_KEEPALIVE_EXPIRY - idle connections will still expire")
+        tasks.append(asyncio.create_task(keepalive_worker()))
+    return tasks
+
+# === SERVER LIFESPAN ===
+
+@asynccontextmanager
+async def shared_resources():
+    """Hold the shared HTTP client, entry store, background sync and connection warming open.
     
-    if hours > 0:
-        return f"{hours}h {minutes}m {secs}s"
-    elif minutes > 0:
-        return f"{minutes}m {secs}s"
-    else:
-        return f"{secs}s"
+    Reference counted: the first holder opens them and the last one to exit
+    closes them, so every MCP session in an HTTP server shares one set.
+    """
+    global _shared_holders, _shared_tasks
+    if _shared_holders == 0:
+        get_http_client()
+        sync_task = start_background_sync()
+        _shared_tasks = start_connection_warming() + ([sync_task] if sync_task is not None else [])
+    _shared_holders += 1
+    try:
+        yield
+    finally:
+        _shared_holders -= 1
+        if _shared_holders == 0:
+            tasks, _shared_tasks = _shared_tasks, []
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            close_tenants()
+            await close_http_client()
+            close_entry_store()
+            logger.info("HTTP pool closed")
 
-def format_time_entry(entry):
-    """Format a time entry for display."""
-    description = entry.get('description', 'No description')
-    duration = entry.get('duration', 0)
-    start = entry.get('start', '')
+@asynccontextmanager
+async def server_lifespan(server):
+    """Per-session lifespan: attach the session to the shared resources.
     
-    # Parse start time
-    start_time = ""
-    if start:
+    Sessions only share caches keyed by token, and ending or cancelling one
+    session never closes what the others are using.
+    """
+    async with shared_resources():
+        _metrics["sessions_active"] += 1
+        _metrics["sessions_total"] += 1
         try:
-            dt = datetime.fromisoformat(start.replace('Z', '+00:00'))
-            start_time = dt.strftime('%Y-%m-%d %H:%M')
-        except:
-            start_time = start
+            yield {}
+        finally:
+            _metrics["sessions_active"] -= 1
+
+async def serve_http(transport):
+    """Serve MCP over HTTP, keeping the shared resources open between sessions."""
+    async with shared_resources():
+        if transport == "sse":
+            await get_server().run_sse_async()
+        else:
+            await get_server().run_streamable_http_async()
+
+# Tool functions in registration order, added to the server when it is built
+_tools = []
+# The FastMCP server, built on first use
+_server = None
+
+def tool():
+    """Register a tool function without importing the MCP stack."""
+    def register(fn):
+        _tools.append(fn)
+        return fn
+    return register
+
+def get_server():
+    """Build the FastMCP server and register the tools on first use."""
+    global _server
+    if _server is None:
+        from mcp.server.fastmcp import FastMCP
+        
+        # Initialize MCP server - NO PROMPT PARAMETER!
+        _server = FastMCP(
+            "toggl",
+            lifespan=server_lifespan,
+            host=SERVER_HOST,
+            port=SERVER_PORT,
+            stateless_http=SERVER_STATELESS
+        )
+        for fn in _tools:
+            _server.add_tool(fn)
+    return _server
+
+# === DAEMON ===
+
+def get_daemon_socket_path():
+    """Unix socket of the daemon for the configured token.
+    
+    The name always includes the token's store key, including under a
+    TOGGL_DAEMON_SOCKET override, so hosts configured with different tokens
+    never attach to each other's daemon.
+    """
+    store_key = get_store_key(API_TOKEN)
+    if DAEMON_SOCKET:
+        root, extension = os.path.splitext(DAEMON_SOCKET)
+        return f"{root}-{store_key}{extension}"
+    base = os.environ.get("XDG_RUNTIME_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "toggl-mcp")
+    return os.path.join(base, f"toggl-mcp-{store_key}.sock")
+
+async def serve_daemon_connection(reader, writer):
+    """Run one MCP session over a daemon socket connection (newline-delimited JSON-RPC, as on stdio)."""
+    global _daemon_connections, _daemon_idle_since
+    _daemon_connections += 1
+    server = get_server()._mcp_server
+    read_send, read_recv = anyio.create_memory_object_stream(0)
+    write_send, write_recv = anyio.create_memory_object_stream(0)
+    
+    async def socket_reader():
+        async with read_send:
+            while line := await reader.readline():
+                try:
+                    message = mcp_types.JSONRPCMessage.model_validate_json(line)
+                except Exception as e:
+                    await read_send.send(e)
+                    continue
+                await read_send.send(mcp_message.SessionMessage(message))
+    
+    async def socket_writer():
+        async with write_recv:
+            async for session_message in write_recv:
+                payload = session_message.message.model_dump_json(by_alias=True, exclude_none=True)
+                writer.write(payload.encode() + b"\n")
+                await writer.drain()
+    
+    try:
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(socket_reader)
+            tg.start_soon(socket_writer)
+            async with write_send:
+                await server.run(read_recv, write_send, server.create_initialization_options())
+    except Exception as e:
+        logger.warning(f"Daemon session ended with an error: {e}")
+    finally:
+        _daemon_connections -= 1
+        _daemon_idle_since = time.monotonic()
+        writer.close()
+
+async def run_daemon():
+    """Serve MCP sessions over the daemon socket until idle for DAEMON_IDLE_TIMEOUT."""
+    import fcntl
+    
+    global _daemon_idle_since
+    path = get_daemon_socket_path()
+    os.makedirs(os.path.dirname(path) or ".", mode=0o700, exist_ok=True)
+    
+    # Only one daemon per socket: the lock is held for the daemon's lifetime
+    lock_file = open(f"{path}.lock", "w")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        logger.info(f"Daemon already running on {path}")
+        lock_file.close()
+        return
+    
+    try:
+        if os.path.exists(path):
+            os.unlink(path)
+        async with shared_resources():
+            server = await asyncio.start_unix_server(serve_daemon_connection, path, limit=DAEMON_LINE_LIMIT)
+            os.chmod(path, 0o600)
+            logger.info(f"Daemon listening on {path}")
+            _daemon_idle_since = time.monotonic()
+            async with server:
+                while _daemon_connections or time.monotonic() - _daemon_idle_since < DAEMON_IDLE_TIMEOUT:
+                    await asyncio.sleep(min(DAEMON_IDLE_TIMEOUT, 5.0))
+            logger.info("Daemon idle, shutting down")
+    finally:
+        if os.path.exists(path):
+            os.unlink(path)
+        lock_file.close()
+
+def connect_daemon(path):
+    """Connect to the daemon socket (OSError if no daemon is listening)."""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+def attach_to_daemon():
+    """Connect to the daemon, starting it first if needed; None if it cannot be reached."""
+    path = get_daemon_socket_path()
+    try:
+        return connect_daemon(path)
+    except OSError:
+        pass
     
-    return f"• {description} - {format_duration(duration)} (started: {start_time})"
+    logger.info(f"Starting daemon on {path}")
+    os.makedirs(os.path.dirname(path) or ".", mode=0o700, exist_ok=True)
+    with open(f"{path}.log", "ab") as log_file:
+        subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--daemon"],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=log_file,
+            start_new_session=True
+        )
+    
+    deadline = time.monotonic() + DAEMON_START_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        try:
+            return connect_daemon(path)
+        except OSError:
+            pass
+    return None
 
-async def get_workspace_id():
-    """Get the default workspace ID for the user."""
-    async with httpx.AsyncClient() as client:
+def run_stdio_proxy(sock):
+    """Relay stdin/stdout to a daemon connection until either side closes."""
+    def pump_stdin():
         try:
-            headers = {"Content-Type": "application/json", **get_auth_header()}
-            response = await client.get(f"{BASE_URL}/me", headers=headers, timeout=10)
-            response.raise_for_status()
-            user_data = response.json()
-            
-            # Log the response for debugging
-            logger.info(f"User data response: {user_data}")
-            
-            workspace_id = user_data.get('default_workspace_id')
-            if not workspace_id:
-                logger.warning(f"No default_workspace_id found in response. Available keys: {list(user_data.keys())}")
-                # Try to get the first workspace if no default is set
-                workspaces = user_data.get('workspaces', [])
-                if workspaces:
-                    workspace_id = workspaces[0].get('id')
-                    logger.info(f"Using first available workspace: {workspace_id}")
-            
-            return workspace_id
-        except Exception as e:
-            logger.error(f"Failed to get workspace ID: {e}")
-            return None
+            while chunk := os.read(sys.stdin.fileno(), 65536):
+                sock.sendall(chunk)
+        except OSError:
+            pass
+        finally:
+            try:
+                sock.shutdown(socket.SHUT_WR)
+            except OSError:
+                pass
+    
+    threading.Thread(target=pump_stdin, daemon=True).start()
+    stdout = sys.stdout.buffer
+    while chunk := sock.recv(65536):
+        stdout.write(chunk)
+        stdout.flush()
+    sock.close()
+
+# === STARTUP PROFILE ===
+
+def measure_startup_phases():
+    """Time the startup phases in this process (run by profile_startup in a child)."""
+    phases = {"module_body_ms": (time.perf_counter() - _MODULE_STARTED) * 1000}
+    
+    started = time.perf_counter()
+    get_server()
+    phases["server_build_ms"] = (time.perf_counter() - started) * 1000
+    
+    # Modules the first tool call needs that building the server did not load
+    started = time.perf_counter()
+    for module in (asyncio, httpx, sqlite3, email_utils):
+        module.load()
+    phases["first_call_imports_ms"] = (time.perf_counter() - started) * 1000
+    return phases
+
+def profile_startup(top=15):
+    """Print per-module import times and startup phase timings."""
+    child = subprocess.run(
+        [sys.executable, "-X", "importtime", os.path.abspath(__file__), "--startup-phases"],
+        capture_output=True,
+        text=True
+    )
+    if child.returncode != 0:
+        print(child.stderr, file=sys.stderr)
+        return child.returncode
+    
+    # Lines look like "import time:  self [us] | cumulative | <indent>package"
+    imports = []
+    for line in child.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        if not self_us.strip().isdigit():
+            continue
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        imports.append((name.strip(), depth, int(self_us) / 1000, int(cumulative_us) / 1000))
+    phases = json.loads(child.stdout.strip().splitlines()[-1])
+    
+    print("Startup profile (ms):\n")
+    print(f"  imports total               {sum(cumulative for _, depth, _, cumulative in imports if depth == 0):8.1f}")
+    print(f"  module body                 {phases['module_body_ms']:8.1f}")
+    print(f"  server build (tools)        {phases['server_build_ms']:8.1f}")
+    print(f"  first-call imports          {phases['first_call_imports_ms']:8.1f}")
+    
+    print("\nTop-level imports by cumulative time:\n")
+    for name, _, _, cumulative in sorted((item for item in imports if item[1] == 0), key=lambda item: -item[3])[:top]:
+        print(f"  {cumulative:8.1f}  {name}")
+    
+    print("\nModules by self time:\n")
+    for name, _, self_ms, _ in sorted(imports, key=lambda item: -item[2])[:top]:
+        print(f"  {self_ms:8.1f}  {name}")
+    return 0
+
+# === TOOL OUTPUT SCHEMAS ===
+
+# Tools return Annotated[CallToolResult, <Output>], so FastMCP publishes each
+# output type as the tool's outputSchema. Top-level fields are optional because
+# error results carry only {"error": ...} in the same structured content.
+
+class ToolOutput(TypedDict, total=False):
+    error: str
+
+class TimeEntryOutput(TypedDict):
+    id: int
+    description: str
+    start: str | None
+    duration_seconds: int
+    project_id: int | None
+    workspace_id: int | None
+    tag_ids: list[int]
+
+class RunningEntryOutput(TimeEntryOutput):
+    elapsed_seconds: NotRequired[int]
+
+class StartTimerOutput(ToolOutput, total=False):
+    id: int
+    description: str
+    workspace_id: int
+    project_id: int | None
+    start: str
+
+class StopTimerOutput(ToolOutput, total=False):
+    id: int
+    description: str
+    duration_seconds: int
+    start: str | None
+    stop: str | None
+
+class UserOutput(TypedDict):
+    fullname: str | None
+    email: str | None
+    timezone: str | None
+    default_workspace_id: int | None
+
+class WorkspaceOutput(TypedDict):
+    id: int | None
+    name: str | None
+
+class DebugWorkspaceOutput(ToolOutput, total=False):
+    api_connection: bool
+    token_present: bool
+    token_length: int
+    base_url: str
+    user: UserOutput
+    workspaces: list[WorkspaceOutput]
+    resolved_workspace_id: int | None
+
+class RefreshWorkspaceOutput(ToolOutput, total=False):
+    workspace_id: int | None
+
+class TimerStatsOutput(ToolOutput, total=False):
+    days: int
+    since: str
+    running: RunningEntryOutput | None
+    total_seconds: int
+    entry_count: int
+    average_seconds: int
+    recent_entries: list[TimeEntryOutput]
+    more_entries: int
+    next_cursor: str | None
+
+class EntryFilterOutput(TypedDict):
+    project_id: int | None
+    tag: str | None
+    search: str | None
+
+class TimeEntryListOutput(ToolOutput, total=False):
+    start_date: str
+    end_date: str
+    filters: EntryFilterOutput
+    entries: list[TimeEntryOutput]
+    has_more: bool
+    next_cursor: str | None
+
+class PercentilesOutput(TypedDict):
+    p50: int
+    p90: int
+    p99: int
+
+class HistogramBucketOutput(TypedDict):
+    min_seconds: int
+    max_seconds: int | None
+    count: int
+
+class BreakdownGroupOutput(TypedDict):
+    key: int | str | None
+    name: str | None
+    seconds: int
+    count: int
+
+class TimeBreakdownOutput(ToolOutput, total=False):
+    days: int
+    group_by: str
+    total_seconds: int
+    entry_count: int
+    percentiles: PercentilesOutput
+    histogram: list[HistogramBucketOutput]
+    groups: list[BreakdownGroupOutput]
+
+class ServerMetricsOutput(ToolOutput, total=False):
+    requests: int
+    retries: int
+    retry_wait_seconds: float
+    retries_exhausted: int
+    breaker_trips: int
+    breaker_fast_fails: int
+    coalesced_requests: int
+    sessions_active: int
+    sessions_total: int
+    tenant_evictions: int
+    connections_opened: int
+    connect_seconds: float
+    tls_seconds: float
+    first_request_seconds: float | None
+    prewarm_connections: int
+    prewarm_seconds: float | None
+    keepalive_pings: int
+    keepalive_failures: int
+    tenants: int
+    circuit_state: str
 
 # === MCP TOOLS ===
 
-@mcp.tool()
-async def start_timer(description: str = "", project_id: str = "") -> str:
-    """Start a new timer with optional description and project ID."""
+@tool()
+async def start_timer(description: str = "", project_id: str = "", idempotency_key: str = "", output_format: str = "text") -> Annotated[mcp_types.CallToolResult, StartTimerOutput]:
+    """Start a new timer with optional description and project ID.
+    
+    Pass an idempotency_key to make the create safe to repeat: calls with the
+    same key return the timer created by the first one, and transient errors
+    are retried only after checking that the timer was not already created.
+    output_format: "text" (default), "compact" or "json" (structured only).
+    """
     logger.info(f"Starting timer: {description}")
     
-    if not API_TOKEN:
-        return "❌ Error: TOGGL_API_TOKEN not configured"
+    output_format = parse_output_format(output_format)
+    if output_format is None:
+        return tool_error(OUTPUT_FORMAT_ERROR)
+    
+    if not current_token():
+        return tool_error(TOKEN_MISSING_ERROR)
     
     if not description.strip():
-        return "❌ Error: Description is required to start a timer"
+        return tool_error("❌ Error: Description is required to start a timer")
     
     try:
         workspace_id = await get_workspace_id()
         if not workspace_id:
-            return "❌ Error: Could not retrieve workspace ID. Please check your Toggl API token and account permissions. Use the debug_workspace tool to investigate further."
+            return tool_error("❌ Error: Could not retrieve workspace ID. Please check your Toggl API token and account permissions. Use the debug_workspace tool to investigate further.")
         
         # Prepare the time entry data
         entry_data = {
@@ -137,247 +2435,703 @@ async def start_timer(description: str = "", project_id: str = "") -> str:
             try:
                 entry_data["project_id"] = int(project_id.strip())
             except ValueError:
-                return f"❌ Error: Invalid project ID: {project_id}"
-        
-        async with httpx.AsyncClient() as client:
-            headers = {"Content-Type": "application/json", **get_auth_header()}
-            response = await client.post(
-                f"{BASE_URL}/time_entries",
-                json=entry_data,
-                headers=headers,
-                timeout=10
-            )
-            response.raise_for_status()
-            data = response.json()
-            
-            timer_id = data.get('id')
-            return f"✅ Timer started: '{description}' (ID: {timer_id})"
-            
+                return tool_error(f"❌ Error: Invalid project ID: {project_id}")
+        
+        data = await create_time_entry(entry_data, idempotency_key.strip() or None)
+        
+        # Starting a timer stops any other running one, so this is now the running entry
+        remember_running_entry({"workspace_id": workspace_id, **data})
+        await store_entries([data])
+        
+        timer_id = data.get('id')
+        result = {
+            "id": timer_id,
+            "description": description,
+            "workspace_id": workspace_id,
+            "project_id": entry_data.get("project_id"),
+            "start": data.get('start') or entry_data["start"]
+        }
+        return tool_result(result, output_format, lambda: f"✅ Timer started: '{description}' (ID: {timer_id})")
+        
     except httpx.HTTPStatusError as e:
-        return f"❌ API Error: {e.response.status_code} - {e.response.text}"
+        if e.response.status_code in WORKSPACE_INVALIDATING_STATUSES:
+            invalidate_user_profile()
+        return tool_error(f"❌ API Error: {e.response.status_code} - {e.response.text}")
     except Exception as e:
         logger.error(f"Error starting timer: {e}")
-        return f"❌ Error: {str(e)}"
+        return tool_error(f"❌ Error: {str(e)}")
 
-@mcp.tool()
-async def stop_timer() -> str:
-    """Stop the currently running timer."""
+@tool()
+async def stop_timer(output_format: str = "text") -> Annotated[mcp_types.CallToolResult, StopTimerOutput]:
+    """Stop the currently running timer.
+    
+    output_format: "text" (default), "compact" or "json" (structured only).
+    """
     logger.info("Stopping current timer")
     
-    if not API_TOKEN:
-        return "❌ Error: TOGGL_API_TOKEN not configured"
+    output_format = parse_output_format(output_format)
+    if output_format is None:
+        return tool_error(OUTPUT_FORMAT_ERROR)
+    
+    if not current_token():
+        return tool_error(TOKEN_MISSING_ERROR)
     
     try:
-        # First, get the current running timer
-        async with httpx.AsyncClient() as client:
-            headers = {"Content-Type": "application/json", **get_auth_header()}
-            response = await client.get(
-                f"{BASE_URL}/me/time_entries/current",
-                headers=headers,
-                timeout=10
-            )
-            response.raise_for_status()
-            current_entry = response.json()
+        data = None
+        
+        # Fast path: stop the entry we started or last observed in a single request
+        tracked = get_tenant().running_entry
+        if tracked:
+            description = tracked['description']
+            try:
+                data = await stop_time_entry_confirmed(tracked['workspace_id'], tracked['id'])
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code >= 500:
+                    raise
+                # Entry was stopped, deleted or replaced elsewhere - look it up instead
+                logger.info(f"Tracked entry {tracked['id']} rejected ({e.response.status_code}), discovering current timer")
+                get_tenant().running_entry = None
+        
+        if data is None:
+            # Slow path: discover the current running timer
+            current_entry = await fetch_current_entry()
             
             if not current_entry:
-                return "❌ No timer is currently running"
+                return tool_error("❌ No timer is currently running")
             
             workspace_id = current_entry.get('workspace_id')
             entry_id = current_entry.get('id')
-            description = current_entry.get('description', 'No description')
-            start_time = current_entry.get('start')
+            description = current_entry.get('description') or 'No description'
             
             if not workspace_id or not entry_id:
-                return "❌ Error: Could not get timer details"
-            
-            # Stop the timer by setting the stop time
-            stop_data = {
-                "stop": datetime.now(timezone.utc).isoformat()
-            }
-            
-            response = await client.put(
-                f"{BASE_URL}/time_entries/{entry_id}",
-                json=stop_data,
-                headers=headers,
-                timeout=10
-            )
-            response.raise_for_status()
-            data = response.json()
-            
-            # Calculate duration
-            duration = data.get('duration', 0)
-            duration_str = format_duration(duration)
-            
-            return f"✅ Timer stopped: '{description}' - Duration: {duration_str}"
+                return tool_error("❌ Error: Could not get timer details")
             
+            data = await stop_time_entry_confirmed(workspace_id, entry_id)
+        
+        # Calculate duration
+        duration = data.get('duration', 0)
+        result = {
+            "id": data.get('id'),
+            "description": description,
+            "duration_seconds": duration,
+            "start": data.get('start'),
+            "stop": data.get('stop')
+        }
+        return tool_result(
+            result,
+            output_format,
+            lambda: f"✅ Timer stopped: '{description}' - Duration: {format_duration(duration)}"
+        )
+        
     except httpx.HTTPStatusError as e:
-        return f"❌ API Error: {e.response.status_code} - {e.response.text}"
+        if e.response.status_code in WORKSPACE_INVALIDATING_STATUSES:
+            invalidate_user_profile()
+        return tool_error(f"❌ API Error: {e.response.status_code} - {e.response.text}")
     except Exception as e:
         logger.error(f"Error stopping timer: {e}")
-        return f"❌ Error: {str(e)}"
+        return tool_error(f"❌ Error: {str(e)}")
 
-@mcp.tool()
-async def debug_workspace() -> str:
-    """Debug tool to check workspace ID retrieval and API connectivity."""
+@tool()
+async def debug_workspace(output_format: str = "text") -> Annotated[mcp_types.CallToolResult, DebugWorkspaceOutput]:
+    """Debug tool to check workspace ID retrieval and API connectivity.
+    
+    output_format: "text" (default), "compact" or "json" (structured only).
+    """
     logger.info("Debugging workspace ID retrieval")
     
-    if not API_TOKEN:
-        return "❌ Error: TOGGL_API_TOKEN not configured"
+    output_format = parse_output_format(output_format)
+    if output_format is None:
+        return tool_error(OUTPUT_FORMAT_ERROR)
+    
+    if not current_token():
+        return tool_error(TOKEN_MISSING_ERROR)
     
     try:
-        async with httpx.AsyncClient() as client:
-            headers = {"Content-Type": "application/json", **get_auth_header()}
-            
-            # Test the /me endpoint
-            response = await client.get(f"{BASE_URL}/me", headers=headers, timeout=10)
-            response.raise_for_status()
-            user_data = response.json()
-            
+        token = current_token()
+        
+        # Test the /me endpoint, bypassing the profile cache
+        user_data = await get_user_profile(force_refresh=True, with_related_data=True)
+        
+        # Test workspace ID retrieval function (served from the profile just fetched)
+        workspace_id = await get_workspace_id()
+        
+        result = {
+            "api_connection": True,
+            "token_present": bool(token),
+            "token_length": len(token),
+            "base_url": BASE_URL,
+            "user": {
+                "fullname": user_data.get('fullname'),
+                "email": user_data.get('email'),
+                "timezone": user_data.get('timezone'),
+                "default_workspace_id": user_data.get('default_workspace_id')
+            },
+            "workspaces": [
+                {"id": ws.get('id'), "name": ws.get('name')}
+                for ws in user_data.get('workspaces', [])
+            ],
+            "resolved_workspace_id": workspace_id
+        }
+        
+        def render_full():
             debug_info = "🔍 Debug Information:\n\n"
             debug_info += f"✅ API Connection: Success\n"
-            debug_info += f"📊 Response Status: {response.status_code}\n"
-            debug_info += f"🔑 API Token Present: {'Yes' if API_TOKEN else 'No'}\n"
-            debug_info += f"🔑 Token Length: {len(API_TOKEN) if API_TOKEN else 0}\n"
-            debug_info += f"🔑 Token Preview: {API_TOKEN[:8] + '...' if API_TOKEN else 'N/A'}\n"
+            debug_info += f"🔑 API Token Present: {'Yes' if token else 'No'}\n"
+            debug_info += f"🔑 Token Length: {len(token) if token else 0}\n"
+            debug_info += f"🔑 Token Preview: {token[:8] + '...' if token else 'N/A'}\n"
             debug_info += f"🌐 Base URL: {BASE_URL}\n\n"
             
             debug_info += "📋 User Data Response:\n"
             debug_info += f"• Full Name: {user_data.get('fullname', 'N/A')}\n"
             debug_info += f"• Email: {user_data.get('email', 'N/A')}\n"
+            debug_info += f"• Timezone: {user_data.get('timezone', 'N/A')}\n"
             debug_info += f"• Default Workspace ID: {user_data.get('default_workspace_id', 'N/A')}\n"
-            debug_info += f"• Workspaces: {len(user_data.get('workspaces', []))} found\n\n"
+            debug_info += f"• Workspaces: {len(result['workspaces'])} found\n\n"
             
             # Show all workspaces
-            workspaces = user_data.get('workspaces', [])
-            if workspaces:
+            if result['workspaces']:
                 debug_info += "🏢 Available Workspaces:\n"
-                for ws in workspaces:
-                    debug_info += f"• ID: {ws.get('id')} - Name: {ws.get('name', 'N/A')}\n"
+                for ws in result['workspaces']:
+                    debug_info += f"• ID: {ws['id']} - Name: {ws['name'] or 'N/A'}\n"
             else:
                 debug_info += "⚠️ No workspaces found in response\n"
             
-            # Test workspace ID retrieval function
-            workspace_id = await get_workspace_id()
             debug_info += f"\n🔧 get_workspace_id() result: {workspace_id}\n"
-            
             return debug_info
-            
+        
+        def render_compact():
+            return (
+                f"✅ API OK - {user_data.get('fullname', 'N/A')}, "
+                f"workspace {workspace_id}, {len(result['workspaces'])} workspaces"
+            )
+        
+        return tool_result(result, output_format, render_full, render_compact)
+        
     except httpx.HTTPStatusError as e:
-        return f"❌ API Error: {e.response.status_code} - {e.response.text}"
+        return tool_error(f"❌ API Error: {e.response.status_code} - {e.response.text}")
     except Exception as e:
         logger.error(f"Error in debug_workspace: {e}")
-        return f"❌ Error: {str(e)}"
+        return tool_error(f"❌ Error: {str(e)}")
+
+@tool()
+async def refresh_workspace(output_format: str = "text") -> Annotated[mcp_types.CallToolResult, RefreshWorkspaceOutput]:
+    """Clear the cached user profile and workspace ID and fetch them again from Toggl.
+    
+    output_format: "text" (default), "compact" or "json" (structured only).
+    """
+    logger.info("Refreshing cached user profile")
+    
+    output_format = parse_output_format(output_format)
+    if output_format is None:
+        return tool_error(OUTPUT_FORMAT_ERROR)
+    
+    if not current_token():
+        return tool_error(TOKEN_MISSING_ERROR)
+    
+    invalidate_user_profile()
+    workspace_id = await get_workspace_id(force_refresh=True)
+    if not workspace_id:
+        return tool_error("❌ Error: Could not retrieve workspace ID. Use the debug_workspace tool to investigate further.")
+    
+    return tool_result(
+        {"workspace_id": workspace_id},
+        output_format,
+        lambda: f"✅ Workspace ID refreshed: {workspace_id}"
+    )
 
-@mcp.tool()
-async def view_timer_stats(days: str = "7") -> str:
-    """View timer statistics for the specified number of days (default: 7 days)."""
+@tool()
+async def view_timer_stats(days: str = "7", limit: str = "10", output_format: str = "text", cursor: str = "", max_tokens: str = "", max_bytes: str = "") -> Annotated[mcp_types.CallToolResult, TimerStatsOutput]:
+    """View timer statistics for the specified number of days (default: 7 days), listing up to limit recent entries.
+    
+    output_format: "text" (default), "compact" or "json" (structured only).
+    max_tokens / max_bytes cap the response text: summary lines are always kept and
+    the entry list is cut short with an "N more" marker and a cursor for the next page.
+    Pass that cursor back (days is then taken from the cursor) to continue the list.
+    """
     logger.info(f"Viewing timer stats for {days} days")
     
-    if not API_TOKEN:
-        return "❌ Error: TOGGL_API_TOKEN not configured"
+    output_format = parse_output_format(output_format)
+    if output_format is None:
+        return tool_error(OUTPUT_FORMAT_ERROR)
+    
+    if not current_token():
+        return tool_error(TOKEN_MISSING_ERROR)
     
     try:
-        # Convert days to integer
+        days_int = parse_days(days)
         try:
-            days_int = int(days) if days.strip() else 7
-            if days_int <= 0:
-                days_int = 7
+            limit_int = max(0, int(limit)) if limit.strip() else 10
         except ValueError:
-            days_int = 7
+            limit_int = 10
+        budget = parse_budget(max_tokens, max_bytes)
         
-        # Get current running timer
-        current_timer = None
-        async with httpx.AsyncClient() as client:
-            headers = {"Content-Type": "application/json", **get_auth_header()}
-            
-            # Check for current timer
-            response = await client.get(
-                f"{BASE_URL}/me/time_entries/current",
-                headers=headers,
-                timeout=10
-            )
-            response.raise_for_status()
-            current_timer = response.json()
-            
-            # Get recent time entries
-            since_date = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
-            since_date = since_date.replace(day=since_date.day - days_int + 1)
-            
-            params = {
-                "since": since_date.isoformat(),
+        # Get recent time entries
+        since_date = window_start(days_int)
+        after = None
+        if cursor.strip():
+            state = read_cursor(cursor, lambda payload: (
+                int(payload["d"]),
+                datetime.fromtimestamp(payload["s"], timezone.utc),
+                tuple(payload["k"])
+            ))
+            if state is None:
+                return tool_error(INVALID_CURSOR_ERROR)
+            days_int, since_date, after = state
+        
+        if days_int > MAX_RANGE_DAYS:
+            return tool_error(RANGE_TOO_LONG_ERROR)
+        
+        # Aggregate in a single pass so entries never need to be held in memory;
+        # only the most recent completed entries past the cursor are kept
+        columns = EntryColumns()
+        recent = TopK(limit_int, start_epoch_key)
+        
+        entry_count = 0
+        remaining = 0
+        
+        def aggregate(entries):
+            nonlocal entry_count, remaining
+            for entry in entries:
+                entry_count += 1
+                if entry.duration > 0:  # Only count completed entries
+                    columns.append(entry)
+                    # limit=0 hides the list, so there is nothing left to page through
+                    if limit_int and (after is None or start_epoch_key(entry) < after):
+                        remaining += 1
+                        recent.push(entry)
+        
+        # The current timer and the entry history are independent, so fetch them together
+        current_timer, _ = await gather_or_cancel(
+            fetch_current_entry(),
+            load_time_entries(since_date, aggregate)
+        )
+        
+        # Current timer status
+        running = None
+        if current_timer:
+            running_entry = TimeEntry.from_json(current_timer)
+            running = running_entry.to_json()
+            if running_entry.start:
+                running["elapsed_seconds"] = int((datetime.now(timezone.utc) - running_entry.start).total_seconds())
+        
+        total_seconds = columns.total()
+        page = recent.result()
+        summary = {
+            "days": days_int,
+            "since": since_date.isoformat(),
+            "running": running,
+            "total_seconds": total_seconds,
+            "entry_count": len(columns),
+            "average_seconds": total_seconds // len(columns) if columns else 0
+        }
+        
+        def build_result(shown):
+            more = remaining - shown
+            next_cursor = None
+            if more > 0 and shown:
+                next_cursor = encode_cursor({
+                    "d": days_int,
+                    "s": int(since_date.timestamp()),
+                    "k": list(start_epoch_key(page[shown - 1]))
+                })
+            return {
+                **summary,
+                "recent_entries": [entry.to_json() for entry in page[:shown]],
+                "more_entries": more,
+                "next_cursor": next_cursor
             }
-            
-            response = await client.get(
-                f"{BASE_URL}/me/time_entries",
-                headers=headers,
-                params=params,
-                timeout=10
-            )
-            response.raise_for_status()
-            entries = response.json()
-            
+        
+        def render_full(result):
             # Build stats
             stats_text = f"📊 Timer Stats (Last {days_int} days):\n\n"
             
-            # Current timer status
-            if current_timer:
-                desc = current_timer.get('description', 'No description')
-                start = current_timer.get('start', '')
-                try:
-                    start_dt = datetime.fromisoformat(start.replace('Z', '+00:00'))
-                    elapsed = datetime.now(timezone.utc) - start_dt
-                    elapsed_str = format_duration(int(elapsed.total_seconds()))
-                    stats_text += f"⏱️ Currently Running: '{desc}' - {elapsed_str}\n\n"
-                except:
-                    stats_text += f"⏱️ Currently Running: '{desc}'\n\n"
-            else:
+            if running is None:
                 stats_text += "⏸️ No timer currently running\n\n"
+            elif "elapsed_seconds" in running:
+                stats_text += f"⏱️ Currently Running: '{running['description']}' - {format_duration(running['elapsed_seconds'])}\n\n"
+            else:
+                stats_text += f"⏱️ Currently Running: '{running['description']}'\n\n"
             
-            if not entries:
+            if not entry_count:
                 stats_text += "No time entries found for the selected period."
                 return stats_text
             
-            # Calculate total time
-            total_seconds = 0
-            completed_entries = []
-            
-            for entry in entries:
-                duration = entry.get('duration', 0)
-                if duration > 0:  # Only count completed entries
-                    total_seconds += duration
-                    completed_entries.append(entry)
-            
             stats_text += f"⏰ Total Time Tracked: {format_duration(total_seconds)}\n"
-            stats_text += f"📈 Number of Entries: {len(completed_entries)}\n"
+            stats_text += f"📈 Number of Entries: {len(columns)}\n"
             
-            if completed_entries:
-                avg_duration = total_seconds / len(completed_entries)
-                stats_text += f"📊 Average Entry Duration: {format_duration(int(avg_duration))}\n\n"
+            if columns:
+                stats_text += f"📊 Average Entry Duration: {format_duration(result['average_seconds'])}\n\n"
                 
-                # Show recent entries (up to 10)
-                stats_text += "Recent Entries:\n"
-                recent_entries = sorted(completed_entries, key=lambda x: x.get('start', ''), reverse=True)[:10]
+                # Show recent entries (up to limit and the response budget)
+                shown = page[:len(result["recent_entries"])]
+                if shown or result["more_entries"]:
+                    stats_text += "Recent Entries:\n"
                 
-                for entry in recent_entries:
+                for entry in shown:
                     stats_text += format_time_entry(entry) + "\n"
+                
+                if result["more_entries"]:
+                    budget_cut = len(shown) < len(page)
+                    stats_text += more_marker(result["more_entries"], result["next_cursor"], budget_cut) + "\n"
             
             return stats_text
-            
+        
+        def render_compact(result):
+            text = (
+                f"{days_int}d: {format_duration(total_seconds)} in {len(columns)} entries "
+                f"(avg {format_duration(result['average_seconds'])})"
+            )
+            if running is not None:
+                text += f"; running: '{running['description']}'"
+            return text
+        
+        return paged_tool_result(build_result, len(page), budget, output_format, render_full, render_compact)
+        
     except httpx.HTTPStatusError as e:
-        return f"❌ API Error: {e.response.status_code} - {e.response.text}"
+        return tool_error(f"❌ API Error: {e.response.status_code} - {e.response.text}")
     except Exception as e:
         logger.error(f"Error getting timer stats: {e}")
-        return f"❌ Error: {str(e)}"
+        return tool_error(f"❌ Error: {str(e)}")
+
+@tool()
+async def list_time_entries(start_date: str = "", end_date: str = "", project_id: str = "", tag: str = "", search: str = "", page_size: str = "50", cursor: str = "", output_format: str = "text", max_tokens: str = "", max_bytes: str = "") -> Annotated[mcp_types.CallToolResult, TimeEntryListOutput]:
+    """List time entries newest first, one page at a time.
+    
+    start_date / end_date: YYYY-MM-DD, inclusive (default: the last 7 days).
+    project_id, tag (name or ID) and search (text in the description) filter the list.
+    Pass next_cursor back as cursor for the next page; the range and filters are taken from the cursor.
+    output_format: "text" (default), "compact" or "json" (structured only).
+    max_tokens / max_bytes cap the response text, ending the page early with a cursor.
+    """
+    logger.info(f"Listing time entries {start_date or '-'} to {end_date or '-'}")
+    
+    output_format = parse_output_format(output_format)
+    if output_format is None:
+        return tool_error(OUTPUT_FORMAT_ERROR)
+    
+    if not current_token():
+        return tool_error(TOKEN_MISSING_ERROR)
+    
+    try:
+        page_size_int = min(max(1, int(page_size)), LIST_MAX_PAGE_SIZE) if page_size.strip() else LIST_DEFAULT_PAGE_SIZE
+    except ValueError:
+        page_size_int = LIST_DEFAULT_PAGE_SIZE
+    budget = parse_budget(max_tokens, max_bytes)
+    
+    before = None
+    if cursor.strip():
+        state = read_cursor(cursor, lambda payload: (
+            datetime.fromtimestamp(payload["a"], timezone.utc),
+            datetime.fromtimestamp(payload["b"], timezone.utc),
+            tuple(payload["k"]),
+            EntryFilter.from_cursor(payload)
+        ))
+        if state is None:
+            return tool_error(INVALID_CURSOR_ERROR)
+        since_date, until_date, before, entry_filter = state
+    else:
+        try:
+            since_date = parse_date(start_date) if start_date.strip() else window_start(7)
+            until_date = (parse_date(end_date) if end_date.strip() else window_start(1)) + timedelta(days=1)
+        except ValueError:
+            return tool_error("❌ Error: Dates must be in YYYY-MM-DD format")
+        if until_date <= since_date:
+            return tool_error("❌ Error: end_date must not be before start_date")
+        
+        try:
+            project_id_int = int(project_id.strip()) if project_id.strip() else None
+        except ValueError:
+            return tool_error(f"❌ Error: Invalid project ID: {project_id}")
+        entry_filter = EntryFilter(project_id_int, tag.strip() or None, search.strip() or None)
+    
+    if (until_date - since_date).days > MAX_RANGE_DAYS:
+        return tool_error(RANGE_TOO_LONG_ERROR)
+    
+    try:
+        def read_page(entries):
+            # Read one entry past the page to learn whether another page exists
+            page = []
+            for entry in entries:
+                if entry_filter.matches(entry):
+                    page.append(entry)
+                    if len(page) > page_size_int:
+                        break
+            return page
+        
+        page = await load_time_entries_page(since_date, until_date, before, read_page)
+        has_more = len(page) > page_size_int
+        del page[page_size_int:]
+        
+        first_day = since_date.date().isoformat()
+        last_day = (until_date - timedelta(days=1)).date().isoformat()
+        
+        def build_result(shown):
+            next_cursor = None
+            if shown and (has_more or shown < len(page)):
+                next_cursor = encode_cursor({
+                    "a": int(since_date.timestamp()),
+                    "b": int(until_date.timestamp()),
+                    "k": list(start_epoch_key(page[shown - 1])),
+                    **entry_filter.to_cursor()
+                })
+            return {
+                "start_date": first_day,
+                "end_date": last_day,
+                "filters": entry_filter.to_json(),
+                "entries": [entry.to_json() for entry in page[:shown]],
+                "has_more": has_more or shown < len(page),
+                "next_cursor": next_cursor
+            }
+        
+        def render_full(result):
+            list_text = f"📋 Time Entries ({first_day} to {last_day}):\n\n"
+            shown = page[:len(result["entries"])]
+            if not shown and not result["has_more"]:
+                list_text += "No time entries found for the selected period."
+                return list_text
+            
+            for entry in shown:
+                list_text += format_time_entry(entry) + f" [ID: {entry.id}]\n"
+            
+            if result["has_more"]:
+                list_text += more_marker(None, result["next_cursor"], len(shown) < len(page)) + "\n"
+            
+            return list_text
+        
+        def render_compact(result):
+            lines = [
+                f"{entry.id} {entry.start.strftime('%Y-%m-%d %H:%M') if entry.start else '-'} "
+                f"{format_duration(entry.duration)} {entry.description}"
+                for entry in page[:len(result["entries"])]
+            ]
+            if result["has_more"]:
+                lines.append(more_marker(None, result["next_cursor"], len(result["entries"]) < len(page)))
+            return "\n".join(lines) or "No time entries"
+        
+        return paged_tool_result(build_result, len(page), budget, output_format, render_full, render_compact)
+        
+    except httpx.HTTPStatusError as e:
+        return tool_error(f"❌ API Error: {e.response.status_code} - {e.response.text}")
+    except Exception as e:
+        logger.error(f"Error listing time entries: {e}")
+        return tool_error(f"❌ Error: {str(e)}")
+
+@tool()
+async def view_time_breakdown(days: str = "7", group_by: str = "project", output_format: str = "text") -> Annotated[mcp_types.CallToolResult, TimeBreakdownOutput]:
+    """View tracked time grouped by day, project, tag or client, with duration percentiles and a histogram.
+    
+    output_format: "text" (default), "compact" or "json" (structured only).
+    """
+    logger.info(f"Viewing time breakdown by {group_by} for {days} days")
+    
+    output_format = parse_output_format(output_format)
+    if output_format is None:
+        return tool_error(OUTPUT_FORMAT_ERROR)
+    
+    if not current_token():
+        return tool_error(TOKEN_MISSING_ERROR)
+    
+    group_by = group_by.strip().lower() or "project"
+    if group_by not in GROUP_BY_OPTIONS:
+        return tool_error(f"❌ Error: group_by must be one of: {', '.join(GROUP_BY_OPTIONS)}")
+    
+    try:
+        days_int = parse_days(days)
+        if days_int > MAX_RANGE_DAYS:
+            return tool_error(RANGE_TOO_LONG_ERROR)
+        
+        columns = EntryColumns()
+        
+        def collect(entries):
+            for entry in entries:
+                if entry.duration > 0:
+                    columns.append(entry)
+        
+        # Start the window at local midnight so a by-day breakdown has exactly days_int days
+        tz = await get_user_timezone()
+        await load_time_entries(window_start(days_int, tz), collect)
+        
+        if not columns:
+            return tool_result(
+                {"days": days_int, "group_by": group_by, "total_seconds": 0, "entry_count": 0, "groups": []},
+                output_format,
+                lambda: f"📊 Time Breakdown by {group_by.title()} (Last {days_int} days):\n\nNo completed time entries found for the selected period."
+            )
+        
+        total_seconds = columns.total()
+        p50, p90, p99 = columns.percentiles(50, 90, 99)
+        bounds = (0,) + DURATION_HISTOGRAM_BOUNDS + (None,)
+        histogram = [
+            {"min_seconds": low, "max_seconds": high, "count": count}
+            for low, high, count in zip(bounds, bounds[1:], columns.histogram())
+        ]
+        
+        # Names come from the related data on the cached profile; fall back to IDs
+        names = {}
+        project_clients = {}
+        if group_by != "day":
+            try:
+                user_data = await get_user_profile(with_related_data=True)
+                related = {"project": "projects", "client": "clients", "tag": "tags"}[group_by]
+                names = {item.get('id'): item.get('name') for item in user_data.get(related) or []}
+                project_clients = {
+                    project.get('id'): project.get('client_id') or 0
+                    for project in user_data.get('projects') or []
+                }
+            except Exception as e:
+                logger.warning(f"Could not load names for breakdown: {e}")
+        
+        if group_by == "day":
+            # Days follow the user's Toggl time zone, not UTC
+            groups = sorted(columns.by_day(tz).items(), reverse=True)
+        else:
+            if group_by == "project":
+                groups = columns.by_project()
+            elif group_by == "tag":
+                groups = columns.by_tag()
+            else:
+                groups = columns.by_client(project_clients)
+            groups = sorted(groups.items(), key=lambda item: item[1][0], reverse=True)
+        
+        result = {
+            "days": days_int,
+            "group_by": group_by,
+            "total_seconds": total_seconds,
+            "entry_count": len(columns),
+            "percentiles": {"p50": p50, "p90": p90, "p99": p99},
+            "histogram": histogram,
+            "groups": [
+                {
+                    "key": key.isoformat() if group_by == "day" else (key or None),
+                    "name": None if group_by == "day" or not key else names.get(key),
+                    "seconds": seconds,
+                    "count": count
+                }
+                for key, (seconds, count) in groups
+            ]
+        }
+        
+        def group_label(group):
+            if group_by == "day":
+                return group["key"]
+            if group["key"] is None:
+                return f"No {group_by}"
+            return f"{group['name'] or 'Unknown'} (ID: {group['key']})"
+        
+        def render_full():
+            breakdown_text = f"📊 Time Breakdown by {group_by.title()} (Last {days_int} days):\n\n"
+            breakdown_text += f"⏰ Total Time Tracked: {format_duration(total_seconds)}\n"
+            breakdown_text += f"📈 Number of Entries: {len(columns)}\n"
+            breakdown_text += f"📏 Entry Duration p50 / p90 / p99: {format_duration(p50)} / {format_duration(p90)} / {format_duration(p99)}\n\n"
+            
+            breakdown_text += "📊 Duration Histogram:\n"
+            for bucket in histogram:
+                if bucket["min_seconds"] == 0:
+                    label = f"< {format_duration(bucket['max_seconds'])}"
+                elif bucket["max_seconds"] is None:
+                    label = f"≥ {format_duration(bucket['min_seconds'])}"
+                else:
+                    label = f"{format_duration(bucket['min_seconds'])} - {format_duration(bucket['max_seconds'])}"
+                breakdown_text += f"• {label}: {bucket['count']}\n"
+            
+            breakdown_text += f"\n🗂️ By {group_by.title()}:\n"
+            for group in result["groups"]:
+                share = group["seconds"] * 100 / total_seconds if total_seconds else 0
+                breakdown_text += f"• {group_label(group)} - {format_duration(group['seconds'])} ({group['count']} entries, {share:.0f}%)\n"
+            
+            return breakdown_text
+        
+        def render_compact():
+            lines = [f"{days_int}d by {group_by}: {format_duration(total_seconds)} in {len(columns)} entries"]
+            lines += [f"{group_label(group)}: {format_duration(group['seconds'])}" for group in result["groups"]]
+            return "\n".join(lines)
+        
+        return tool_result(result, output_format, render_full, render_compact)
+        
+    except httpx.HTTPStatusError as e:
+        return tool_error(f"❌ API Error: {e.response.status_code} - {e.response.text}")
+    except Exception as e:
+        logger.error(f"Error getting time breakdown: {e}")
+        return tool_error(f"❌ Error: {str(e)}")
+
+@tool()
+async def view_server_metrics(output_format: str = "text") -> Annotated[mcp_types.CallToolResult, ServerMetricsOutput]:
+    """View request, retry and cache metrics for this server process.
+    
+    output_format: "text" (default), "compact" or "json" (structured only).
+    """
+    logger.info("Viewing server metrics")
+    
+    output_format = parse_output_format(output_format)
+    if output_format is None:
+        return tool_error(OUTPUT_FORMAT_ERROR)
+    
+    result = {**_metrics, "tenants": len(_tenants), "circuit_state": circuit_breaker.state}
+    
+    def render_full():
+        metrics_text = "📈 Server Metrics:\n\n"
+        metrics_text += f"🌐 Upstream Requests: {result['requests']}\n"
+        metrics_text += f"🔁 Retries: {result['retries']}\n"
+        metrics_text += f"⏳ Time Spent Retrying: {result['retry_wait_seconds']:.2f}s\n"
+        metrics_text += f"❌ Retries Exhausted: {result['retries_exhausted']}\n"
+        metrics_text += f"🤝 Coalesced Requests: {result['coalesced_requests']}\n"
+        metrics_text += f"🔌 Circuit State: {result['circuit_state']}\n"
+        metrics_text += f"⚡ Circuit Trips: {result['breaker_trips']}\n"
+        metrics_text += f"🚫 Fast-Failed Requests: {result['breaker_fast_fails']}\n"
+        metrics_text += f"👥 Active Sessions: {result['sessions_active']} ({result['sessions_total']} total)\n"
+        metrics_text += f"🔐 Cached Tenants: {result['tenants']} ({result['tenant_evictions']} evicted)\n"
+        metrics_text += f"🔗 Connections Opened: {result['connections_opened']} (connect {result['connect_seconds'] * 1000:.0f} ms, TLS {result['tls_seconds'] * 1000:.0f} ms in total)\n"
+        if result['first_request_seconds'] is not None:
+            metrics_text += f"⏱️ First Request: {result['first_request_seconds'] * 1000:.0f} ms\n"
+        if result['prewarm_seconds'] is not None:
+            metrics_text += f"🔥 Pre-warm: {result['prewarm_connections']} connections in {result['prewarm_seconds'] * 1000:.0f} ms\n"
+        metrics_text += f"💓 Keepalive Pings: {result['keepalive_pings']} ({result['keepalive_failures']} failed)\n"
+        return metrics_text
+    
+    def render_compact():
+        return " ".join(f"{key}={value:.2f}" if isinstance(value, float) else f"{key}={value}" for key, value in result.items())
+    
+    return tool_result(result, output_format, render_full, render_compact)
 
 # === SERVER STARTUP ===
 if __name__ == "__main__":
+    if "--profile-startup" in sys.argv[1:]:
+        sys.exit(profile_startup())
+    if "--startup-phases" in sys.argv[1:]:
+        print(json.dumps(measure_startup_phases()))
+        sys.exit(0)
+    
     logger.info("Starting Toggl Time Tracking MCP server...")
     
-    if not API_TOKEN:
+    if MULTI_TENANT:
+        if SERVER_TRANSPORT == "stdio":
+            logger.warning("TOGGL_MULTI_TENANT needs an HTTP transport - stdio calls carry no token")
+    elif API_TOKEN:
+        logger.info("API Token configured: Yes")
+    else:
         logger.warning("TOGGL_API_TOKEN not set - server will not be able to connect to Toggl API")
     
+    if SERVER_TRANSPORT not in SERVER_TRANSPORTS:
+        logger.error(f"TOGGL_TRANSPORT must be one of: {', '.join(SERVER_TRANSPORTS)}")
+        sys.exit(1)
+    
+    if "--daemon" in sys.argv[1:]:
+        asyncio.run(run_daemon())
+        sys.exit(0)
+    
+    if DAEMON_ENABLED and SERVER_TRANSPORT == "stdio":
+        sock = attach_to_daemon()
+        if sock is not None:
+            run_stdio_proxy(sock)
+            sys.exit(0)
+        logger.warning("Daemon unavailable, serving this session in-process")
+    
     try:
-        mcp.run(transport='stdio')
+        if SERVER_TRANSPORT == "stdio":
+            get_server().run(transport='stdio')
+        else:
+            logger.info(f"Serving {SERVER_TRANSPORT} on {SERVER_HOST}:{SERVER_PORT}")
+            asyncio.run(serve_http(SERVER_TRANSPORT))
     except Exception as e:
         logger.error(f"Server error: {e}", exc_info=True)
         sys.exit(1)
\ No newline at end of file